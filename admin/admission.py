@@ -0,0 +1,45 @@
+import threading
+import time
+from contextlib import contextmanager
+
+from admin.metrics import observe
+from config import UPLOAD_ADMISSION_WAIT, UPLOAD_MAX_INFLIGHT_BYTES, UPLOAD_MAX_PARSES
+
+# Parses running in this process and the bytes of their files; changes are announced on the condition
+_condition = threading.Condition()
+_parses = 0
+_inflight_bytes = 0
+
+
+def _has_room(size):
+    if _parses >= UPLOAD_MAX_PARSES:
+        return False
+    # A file bigger than the byte cap on its own still runs, once nothing else is in flight
+    return _inflight_bytes == 0 or _inflight_bytes + size <= UPLOAD_MAX_INFLIGHT_BYTES
+
+
+@contextmanager
+def upload_admission(size, wait=UPLOAD_ADMISSION_WAIT):
+    """
+    Holds a parse slot and `size` in-flight bytes for the block. Waits up to `wait` seconds for
+    room (None: as long as it takes); yields False when there was none, True otherwise.
+    """
+    global _parses, _inflight_bytes
+    start = time.monotonic()
+    with _condition:
+        admitted = _condition.wait_for(lambda: _has_room(size), timeout=wait)
+        if admitted:
+            _parses += 1
+            _inflight_bytes += size
+    observe('statement_admission_wait_seconds', time.monotonic() - start)
+    if not admitted:
+        yield False
+        return
+
+    try:
+        yield True
+    finally:
+        with _condition:
+            _parses -= 1
+            _inflight_bytes -= size
+            _condition.notify_all()
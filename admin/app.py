@@ -1,28 +1,49 @@
-from flask import Flask
+import time
+
+import click
+from flask import Flask, current_app, jsonify
 from dotenv import load_dotenv
 from flasgger import Swagger
 from flask_migrate import Migrate
 from flask_cors import CORS
+from werkzeug.exceptions import RequestEntityTooLarge
 
-from admin.database import db
+from admin.backfill import backfill_statements, statement_paths
+from admin.database import backfill_fingerprints, db
+from admin.utils import StatementRequest
 
-from config import BANK_DATABASE_URI
-from admin.statements_hdfc import hdfc_bp
-from admin.statements_icici import icici_bp
-from admin.statements_sbi import sbi_bp
+from config import BANK_DATABASE_URI, MAX_CONTENT_LENGTH, SQLALCHEMY_ENGINE_OPTIONS
+from admin.banks import BANK_FORMATS
+from admin.statements import statements_bp
+from admin.jobs import jobs_bp
+from admin.batches import batches_bp
+from admin.export import export_bp
+from admin.summary import rebuild_daily_summary, summary_bp
+from admin.metrics import metrics_bp
+from admin.reconcile import reconcile_bp
+from admin.search import backfill_reference_tokens, search_bp
 
 app = Flask(__name__)
+# Big uploads are spooled to named temp files the statement readers open by path
+app.request_class = StatementRequest
 swagger = Swagger(app)
 CORS(app)
 
 # Register the Blueprint
-app.register_blueprint(sbi_bp)
-app.register_blueprint(icici_bp)
-app.register_blueprint(hdfc_bp)
+app.register_blueprint(statements_bp)
+app.register_blueprint(jobs_bp)
+app.register_blueprint(batches_bp)
+app.register_blueprint(export_bp)
+app.register_blueprint(summary_bp)
+app.register_blueprint(metrics_bp)
+app.register_blueprint(search_bp)
+app.register_blueprint(reconcile_bp)
 
 
 app.config['SQLALCHEMY_DATABASE_URI'] = BANK_DATABASE_URI
 app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+app.config['SQLALCHEMY_ENGINE_OPTIONS'] = SQLALCHEMY_ENGINE_OPTIONS
+app.config['MAX_CONTENT_LENGTH'] = MAX_CONTENT_LENGTH
 
 db.init_app(app)
 migrate = Migrate(app, db)
@@ -31,3 +52,69 @@ migrate = Migrate(app, db)
 def index():
     return 'Bank Statments V.02'
 
+
+@app.errorhandler(RequestEntityTooLarge)
+def request_too_large(e):
+    return jsonify({'error': f'Request larger than {current_app.config["MAX_CONTENT_LENGTH"]} bytes'}), 413
+
+
+
+@app.cli.command('backfill-fingerprints')
+def backfill_fingerprints_command():
+    """Fill the dedup fingerprint of statement rows stored before it existed."""
+    for bank_format in BANK_FORMATS.values():
+        model = bank_format['model']
+        updated = backfill_fingerprints(model)
+        print(f"{model.__tablename__}: {updated} rows fingerprinted")
+
+
+@app.cli.command('backfill-reference-tokens')
+def backfill_reference_tokens_command():
+    """Extract the UTR/RRN reference token of statement rows stored before it existed."""
+    for bank in BANK_FORMATS:
+        updated = backfill_reference_tokens(bank)
+        print(f"{bank}: {updated} reference tokens extracted")
+
+
+@app.cli.command('rebuild-daily-summary')
+@click.option('--bank', type=click.Choice(sorted(BANK_FORMATS)), default=None, help='Only this bank (default every bank).')
+def rebuild_daily_summary_command(bank):
+    """Recompute the daily account summary from the statement tables."""
+    for bank in [bank] if bank else BANK_FORMATS:
+        start = time.perf_counter()
+        days = rebuild_daily_summary(bank)
+        db.session.commit()
+        print(f"{bank}: {days} days summarized in {time.perf_counter() - start:.1f}s")
+
+
+@app.cli.command('backfill-statements')
+@click.argument('sources', nargs=-1, required=True)
+@click.option('--workers', type=int, default=None, help='Parsing processes (default BACKFILL_WORKERS, else one per CPU).')
+@click.option('--admin-id', default=None, help='upload_admin_id recorded on the rows (default BACKFILL_ADMIN_ID).')
+def backfill_statements_command(sources, workers, admin_id):
+    """Load historical statements from directories or glob patterns; the bank is detected from each file."""
+    paths = statement_paths(sources)
+    if not paths:
+        raise click.UsageError('No .xls/.xlsx statement files found')
+
+    start = time.perf_counter()
+    files, failed, duplicates, parsed, inserted = 0, 0, 0, 0, 0
+    for result in backfill_statements(paths, workers=workers, admin_id=admin_id):
+        files += 1
+        parsed += result['rows_parsed']
+        inserted += result['rows_inserted']
+        if 'error' in result:
+            failed += 1
+            status = f"failed: {result['error']}"
+        elif result.get('duplicate_file'):
+            duplicates += 1
+            status = 'already stored'
+        else:
+            status = f"{result['rows_parsed']} rows, {result['rows_inserted']} new"
+        elapsed = time.perf_counter() - start
+        print(f"[{files}/{len(paths)}] {result['path']} ({result['bank'] or 'unknown bank'}): {status} "
+              f"| {parsed / elapsed:.0f} rows/s")
+
+    elapsed = time.perf_counter() - start
+    print(f"{files} files ({failed} failed, {duplicates} already stored), {parsed} rows parsed, {inserted} stored "
+          f"in {elapsed:.1f}s: {parsed / elapsed:.0f} rows/s, {files / elapsed:.2f} files/s")
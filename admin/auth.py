@@ -0,0 +1,80 @@
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from config import TOKEN_CACHE_NEGATIVE_TTL, TOKEN_CACHE_SIZE, TOKEN_CACHE_TTL
+from config import TOKEN_CHECK_CONNECT_TIMEOUT, TOKEN_CHECK_POOL_SIZE, TOKEN_CHECK_READ_TIMEOUT, TOKEN_CHECK_URL
+
+# One keep-alive connection pool to the user micro service for the whole process
+_session = requests.Session()
+_session.mount('http://', HTTPAdapter(pool_connections=1, pool_maxsize=TOKEN_CHECK_POOL_SIZE))
+_session.mount('https://', HTTPAdapter(pool_connections=1, pool_maxsize=TOKEN_CHECK_POOL_SIZE))
+
+_lock = threading.Lock()
+# sha256(token) -> (expiry, user or None), least recently used first
+_cache = OrderedDict()
+# sha256(token) -> Future of the upstream check in progress
+_in_flight = {}
+
+
+def _check_token(token):
+    # Returns (user, seconds to cache the answer); 5xx answers are not cached
+    response = _session.post(TOKEN_CHECK_URL, headers={'Authorization': token},
+                             timeout=(TOKEN_CHECK_CONNECT_TIMEOUT, TOKEN_CHECK_READ_TIMEOUT))
+    if response.status_code == 200:
+        user_info = response.json()
+        return (user_info.get("_id"), user_info.get("user_code"), user_info.get("user_name")), TOKEN_CACHE_TTL
+    if response.status_code < 500:
+        return None, TOKEN_CACHE_NEGATIVE_TTL
+    return None, 0
+
+
+def _cache_put(key, user, ttl):
+    with _lock:
+        _cache[key] = (time.monotonic() + ttl, user)
+        _cache.move_to_end(key)
+        while len(_cache) > TOKEN_CACHE_SIZE:
+            _cache.popitem(last=False)
+
+
+def verify_token(token):
+    """
+    (_id, user_code, user_name) of a valid token, None for an invalid one. Answers are served from
+    the TTL/LRU cache; concurrent checks of the same token share one call to the user service.
+    Connection errors and timeouts are raised to the caller.
+    """
+    key = hashlib.sha256(token.encode('utf-8')).hexdigest()
+    with _lock:
+        entry = _cache.get(key)
+        if entry:
+            if entry[0] > time.monotonic():
+                _cache.move_to_end(key)
+                return entry[1]
+            del _cache[key]
+
+        future = _in_flight.get(key)
+        leader = future is None
+        if leader:
+            future = _in_flight[key] = Future()
+
+    if not leader:
+        return future.result()
+
+    try:
+        user, ttl = _check_token(token)
+        if ttl:
+            _cache_put(key, user, ttl)
+        future.set_result(user)
+        return user
+    except Exception as e:
+        future.set_exception(e)
+        raise
+    finally:
+        with _lock:
+            _in_flight.pop(key, None)
+
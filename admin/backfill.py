@@ -0,0 +1,139 @@
+import glob
+import os
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+import pandas as pd
+from werkzeug.datastructures import FileStorage
+
+from admin.banks import BANK_FORMATS
+from admin.database import IngestBatch, UploadedFile, bulk_insert, db, record_batch_duplicates
+from admin.ingest import INVALID_DATES_REPORTED, detect_bank, open_validated_statement, parsed_chunks
+from admin.metrics import timed
+from admin.readers import statement_reader
+from admin.utils import current_datetime, file_digest
+from admin.summary import add_batch_to_summary
+from admin.watermarks import advance_watermark, new_balance_trail, newest_first, track_balances
+from config import BACKFILL_ADMIN_ID, BACKFILL_WORKERS
+
+STATEMENT_EXTENSIONS = ('.xls', '.xlsx')
+
+
+def statement_paths(sources):
+    # Directories (searched recursively) and glob patterns -> sorted statement file paths
+    paths = set()
+    for source in sources:
+        if os.path.isdir(source):
+            for root, _, names in os.walk(source):
+                paths.update(os.path.join(root, name) for name in names if name.lower().endswith(STATEMENT_EXTENSIONS))
+        else:
+            paths.update(path for path in glob.glob(source, recursive=True)
+                         if os.path.isfile(path) and path.lower().endswith(STATEMENT_EXTENSIONS))
+    return sorted(paths)
+
+
+def parse_statement_path(path):
+    """
+    Worker process side of the backfill: bank detection, read, normalize and fingerprint of one
+    statement file. No database access; the rows go back to the writer as one DataFrame.
+    """
+    result = {'path': path, 'bank': None, 'rows_parsed': 0}
+    try:
+        with open(path, 'rb') as stream:
+            file = FileStorage(stream=stream, filename=os.path.basename(path))
+            result['digest'] = file_digest(file)
+            reader = statement_reader(file)
+            if reader is None:
+                return {**result, 'error': 'File is not an Excel workbook (.xls or .xlsx)'}
+
+            bank = result['bank'] = detect_bank(file, reader)
+            if not bank:
+                return {**result, 'error': 'No bank account details found in the header block'}
+
+            timings, date_formats, invalid_dates = {}, {}, []
+            message, chunks = open_validated_statement(bank, file, reader, timings)
+            if message:
+                return {**result, 'error': message}
+            frames = list(parsed_chunks(bank, chunks, timings, date_formats, invalid_dates))
+    except Exception as e:
+        return {**result, 'error': f"Error reading statement {str(e)}"}
+
+    df = pd.concat(frames) if frames else None
+    result.update(rows_parsed=len(df) if df is not None else 0, invalid_dates=invalid_dates[:INVALID_DATES_REPORTED],
+                  timings=timings)
+    if invalid_dates and BANK_FORMATS[bank]['date_errors'] == 'raise':
+        return {**result, 'error': f"Unparseable dates in {len(invalid_dates)} cell(s)"}
+    return {**result, 'frame': df}
+
+
+def store_statement(result, admin_id):
+    """
+    Writer side: rows of one parsed file in one transaction, deduplicated by file digest and row
+    fingerprint. Every row is stored whatever the watermark; the watermark only moves forward.
+    """
+    bank, df = result['bank'], result.pop('frame')
+    bank_format = BANK_FORMATS[bank]
+    if UploadedFile.query.filter_by(bank=bank, digest=result['digest']).first():
+        return {**result, 'duplicate_file': True, 'rows_inserted': 0}
+
+    inserted, upload_time, timings = 0, current_datetime(), result.pop('timings')
+    try:
+        batch = IngestBatch(bank=bank, digest=result['digest'], file_name=os.path.basename(result['path']),
+                            upload_admin_id=admin_id, upload_time=upload_time)
+        db.session.add(batch)
+        db.session.flush()
+        if df is not None:
+            with timed(timings, 'insert'):
+                inserted = bulk_insert(bank_format['model'], df.assign(upload_admin_id=admin_id, upload_time=upload_time,
+                                                                       batch_id=batch.id))
+                if inserted < len(df):
+                    record_batch_duplicates(bank, bank_format['model'], df, batch.id)
+            trail = new_balance_trail(None)
+            track_balances(bank_format, df, trail)
+            advance_watermark(bank, trail)
+            if inserted:
+                with timed(timings, 'summary'):
+                    add_batch_to_summary(bank, batch.id, newest_first(trail))
+        if inserted:
+            status_code, message = 201, f"{bank_format['name']} file data successfully stored in the database"
+        else:
+            status_code, message = 200, 'No new unique transactions to store'
+        batch.status_code, batch.message, batch.stage_seconds = status_code, message, \
+            {stage: round(seconds, 4) for stage, seconds in timings.items()}
+        batch.rows_parsed, batch.rows_inserted = result['rows_parsed'], inserted
+        db.session.add(UploadedFile(
+            bank=bank, digest=result['digest'], file_name=os.path.basename(result['path']), status_code=status_code,
+            message=message, rows_inserted=inserted, upload_admin_id=admin_id, upload_time=current_datetime(),
+            batch_id=batch.id,
+        ))
+        db.session.commit()
+    except Exception as e:
+        db.session.rollback()
+        return {**result, 'error': f"Error storing statement {str(e)}", 'rows_inserted': 0}
+    return {**result, 'rows_inserted': inserted, 'batch_id': batch.id}
+
+
+def backfill_statements(paths, workers=None, admin_id=None):
+    """
+    Parse statement files in a pool of worker processes and store them from this process, as each
+    one is ready. Yields the result of every file (path, bank, rows_parsed, rows_inserted and
+    error / duplicate_file). Needs an application context.
+    """
+    workers = workers or BACKFILL_WORKERS or os.cpu_count() or 1
+    admin_id = admin_id or BACKFILL_ADMIN_ID
+    pending, paths = set(), iter(paths)
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        # At most two parsed files per worker wait for the writer, so memory stays bounded
+        while True:
+            for path in paths:
+                pending.add(executor.submit(parse_statement_path, path))
+                if len(pending) >= workers * 2:
+                    break
+            if not pending:
+                return
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                result = future.result()
+                if 'error' in result:
+                    yield {**result, 'rows_inserted': 0}
+                else:
+                    yield store_statement(result, admin_id)
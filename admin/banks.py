@@ -0,0 +1,111 @@
+from admin.database import HdfcStatement, IciciStatement, SbiStatement
+from config import HDFC_HEAD_ROW, HDFC_REQUIRED_COLUMNS, HDFC_ROW, REQUIRED_BANK_DATA_HDFC
+from config import ICICI_HEAD_ROW, ICICI_REQUIRED_COLUMNS, ICICI_ROW, REQUIRED_BANK_DATA_ICICI
+from config import REQUIRED_BANK_DATA_SBI, SBI_HEAD_ROW, SBI_REQUIRED_COLUMNS, SBI_ROW
+
+# Statement format registry: admin/ingest.py runs every bank from its entry here, so supporting a new
+# bank is a model plus an entry.
+#   name                   display name used in messages
+#   model                  statement table the rows are stored in
+#   header_row             0-based row of the column header
+#   head_rows              rows at the top of the sheet checked for the identity lines
+#   identity               text that must appear in the head rows (account, customer, branch ...)
+#   required_columns       columns the header must have
+#   columns                model field -> statement column; values are converted by the field's column type
+#   coerce_columns         numeric statement columns where non-numeric cells are stored as NULL instead of failing
+#   boundary_marker        transactions sit between the first two rows whose every cell contains this text
+#   footer_after_empty_row the rows after the last empty row are the statement footer
+#   date_formats           known strftime formats of the date column; the first one that fits is detected per file
+#   date_errors            'coerce' stores unparseable dates as NULL, 'raise' rejects the file listing the bad cells
+#   narration_column       model field holding the free-text narration, searched and scanned for UTR/RRN tokens
+#   credit_column          model field holding the credited amount, matched by the reconciliation
+#   credit_filter          extra field -> value conditions a row must meet to be a credit
+#   debit_column           model field holding the debited amount; None when credit_column holds both, signed by credit_filter
+#   balance_column         model field holding the account balance after the transaction
+#   amount_columns         model fields matched by the min_amount/max_amount filters of GET /statement/<bank>
+BANK_FORMATS = {
+    'hdfc': {
+        'name': 'HDFC',
+        'model': HdfcStatement,
+        'header_row': HDFC_ROW,
+        'head_rows': HDFC_HEAD_ROW,
+        'identity': REQUIRED_BANK_DATA_HDFC,
+        'required_columns': HDFC_REQUIRED_COLUMNS,
+        'columns': {
+            'transaction_date': 'Date',
+            'narration': 'Narration',
+            'Ref_or_Cheque_number': 'Chq./Ref.No.',
+            'withdrawal_amount': 'Withdrawal Amt.',
+            'deposit_amount': 'Deposit Amt.',
+            'closing_amount': 'Closing Balance',
+        },
+        'coerce_columns': set(),
+        'boundary_marker': '*',
+        'footer_after_empty_row': False,
+        'date_formats': ['%d/%m/%y', '%d/%m/%Y', '%d-%m-%y', '%d-%m-%Y', '%Y-%m-%d'],
+        'date_errors': 'raise',
+        'narration_column': 'narration',
+        'credit_column': 'deposit_amount',
+        'credit_filter': {},
+        'debit_column': 'withdrawal_amount',
+        'balance_column': 'closing_amount',
+        'amount_columns': ['withdrawal_amount', 'deposit_amount'],
+    },
+    'icici': {
+        'name': 'ICICI',
+        'model': IciciStatement,
+        'header_row': ICICI_ROW,
+        'head_rows': ICICI_HEAD_ROW,
+        'identity': REQUIRED_BANK_DATA_ICICI,
+        'required_columns': ICICI_REQUIRED_COLUMNS,
+        'columns': {
+            'transaction_date': 'Txn Posted Date',
+            'transaction_id': 'Transaction ID',
+            'Ref_or_Cheque_number': 'ChequeNo.',
+            'description': 'Description',
+            'credit_or_debit': 'Cr/Dr',
+            'transaction_amount': 'Transaction Amount(INR)',
+            'available_amount': 'Available Balance(INR)',
+        },
+        'coerce_columns': set(),
+        'boundary_marker': None,
+        'footer_after_empty_row': False,
+        'date_formats': ['%d/%m/%Y %I:%M:%S %p', '%d/%m/%Y %H:%M:%S', '%d-%m-%Y %H:%M:%S', '%d/%m/%Y',
+                         '%m/%d/%Y %I:%M:%S %p', '%Y-%m-%d %H:%M:%S'],
+        'date_errors': 'coerce',
+        'narration_column': 'description',
+        'credit_column': 'transaction_amount',
+        'credit_filter': {'credit_or_debit': 'CR'},
+        'debit_column': None,
+        'balance_column': 'available_amount',
+        'amount_columns': ['transaction_amount'],
+    },
+    'sbi': {
+        'name': 'SBI',
+        'model': SbiStatement,
+        'header_row': SBI_ROW,
+        'head_rows': SBI_HEAD_ROW,
+        'identity': REQUIRED_BANK_DATA_SBI,
+        'required_columns': SBI_REQUIRED_COLUMNS,
+        'columns': {
+            'transaction_date': 'Txn Date',
+            'description': 'Description',
+            'Ref_or_Cheque_number': 'Ref No./Cheque No.',
+            'branch_code': 'Branch Code',
+            'withdrawal_amount': 'Debit',
+            'deposit_amount': 'Credit',
+            'closing_amount': 'Balance',
+        },
+        'coerce_columns': {'Debit', 'Credit'},
+        'boundary_marker': None,
+        'footer_after_empty_row': True,
+        'date_formats': ['%d %b %Y', '%d-%b-%Y', '%d %b %y', '%d/%m/%Y', '%d-%m-%Y'],
+        'date_errors': 'raise',
+        'narration_column': 'description',
+        'credit_column': 'deposit_amount',
+        'credit_filter': {},
+        'debit_column': 'withdrawal_amount',
+        'balance_column': 'closing_amount',
+        'amount_columns': ['withdrawal_amount', 'deposit_amount'],
+    },
+}
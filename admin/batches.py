@@ -0,0 +1,194 @@
+import logging
+
+from flask import Blueprint, jsonify, request
+from sqlalchemy import func, select
+
+from admin.banks import BANK_FORMATS
+from admin.database import IngestBatch, IngestBatchDuplicate, IngestWatermark, UploadedFile, db
+from admin.statements import page_size
+from admin.summary import rebuild_daily_summary
+from admin.utils import current_datetime
+from logs.log import log_data
+
+# Create a Blueprint instance
+batches_bp = Blueprint('batches', __name__)
+
+
+def batch_json(batch):
+    return {
+        'batch_id': batch.id,
+        'bank': batch.bank,
+        'file_name': batch.file_name,
+        'digest': batch.digest,
+        'status_code': batch.status_code,
+        'message': batch.message,
+        'rows_parsed': batch.rows_parsed,
+        'rows_inserted': batch.rows_inserted,
+        'rows_before_watermark': batch.rows_before_watermark,
+        'stage_seconds': batch.stage_seconds,
+        'upload_admin_id': batch.upload_admin_id,
+        'upload_time': batch.upload_time.isoformat() if batch.upload_time else None,
+        'rolled_back_rows': batch.rolled_back_rows,
+        'rolled_back_admin_id': batch.rolled_back_admin_id,
+        'rolled_back_time': batch.rolled_back_time.isoformat() if batch.rolled_back_time else None,
+    }
+
+
+def rollback_batch(batch, admin_id):
+    """
+    Deletes the statement rows of a batch with one DELETE on the batch_id index and frees its file digest
+    for a new upload. Rows that later uploads also supplied, and skipped as duplicates, are handed over to
+    the earliest of those batches instead. The daily summary of the days rows were deleted from is rebuilt,
+    and the bank's watermark is dropped when rows were deleted, since the rows before it are no longer all
+    stored; the next upload reads its whole file again. Returns the number of rows deleted and the rows
+    handed over per batch id.
+    """
+    table = BANK_FORMATS[batch.bank]['model'].__table__
+    duplicates = IngestBatchDuplicate.__table__
+    # The batch's own duplicates of other batches' rows go with it
+    db.session.execute(duplicates.delete().where(duplicates.c.batch_id == batch.id))
+
+    new_owner = select(func.min(duplicates.c.batch_id)).where(
+        duplicates.c.bank == batch.bank, duplicates.c.fingerprint == table.c.fingerprint).scalar_subquery()
+    owners = select(new_owner.label('batch_id')).where(table.c.batch_id == batch.id).subquery()
+    handed_over = dict(db.session.execute(select(owners.c.batch_id, func.count()).where(owners.c.batch_id.isnot(None))
+                                          .group_by(owners.c.batch_id)).all())
+    if handed_over:
+        db.session.execute(table.update().where(table.c.batch_id == batch.id, new_owner.isnot(None))
+                           .values(batch_id=new_owner))
+        # The rows are now the receiving batches' own
+        db.session.execute(duplicates.delete().where(
+            duplicates.c.bank == batch.bank, duplicates.c.batch_id.in_(handed_over),
+            duplicates.c.fingerprint.in_(select(table.c.fingerprint).where(table.c.batch_id == duplicates.c.batch_id))))
+        for receiver in db.session.execute(select(IngestBatch).where(IngestBatch.id.in_(handed_over))).scalars():
+            receiver.rows_inserted = (receiver.rows_inserted or 0) + handed_over[receiver.id]
+
+    earliest, latest = db.session.execute(select(func.min(table.c.transaction_date), func.max(table.c.transaction_date))
+                                          .where(table.c.batch_id == batch.id)).one()
+    deleted = db.session.execute(table.delete().where(table.c.batch_id == batch.id)).rowcount
+    # The days rows were deleted from are summed again from what is left
+    if latest:
+        rebuild_daily_summary(batch.bank, earliest.date(), latest.date())
+    db.session.execute(UploadedFile.__table__.delete().where(UploadedFile.batch_id == batch.id))
+
+    watermark = db.session.get(IngestWatermark, batch.bank, with_for_update=True)
+    if watermark and deleted:
+        db.session.delete(watermark)
+
+    batch.rolled_back_rows = deleted
+    batch.rolled_back_admin_id = admin_id
+    batch.rolled_back_time = current_datetime()
+    db.session.commit()
+    return deleted, handed_over
+
+
+# Upload batches, newest first
+@batches_bp.route('/statement/batches', methods=['GET'])
+def list_batches():
+    """
+    Statement upload batches.
+    ---
+    tags:
+      - Upload Batches
+    parameters:
+      - name: bank
+        in: query
+        type: string
+        description: Only the batches of this bank (hdfc, icici, sbi)
+      - name: limit
+        in: query
+        type: integer
+        description: Page size
+      - name: cursor
+        in: query
+        type: integer
+        description: next_cursor of the previous page
+
+    responses:
+      200:
+        description: One page of batches with row counts and stage durations, newest first
+      400:
+        description: Bad Request - Invalid bank, limit or cursor
+    """
+    bank, cursor = request.args.get('bank'), request.args.get('cursor')
+    if bank and bank not in BANK_FORMATS:
+        return jsonify({'error': f'Unsupported bank {bank}'}), 400
+    if cursor and not cursor.isdigit():
+        return jsonify({'error': f'Invalid cursor: {cursor}'}), 400
+    try:
+        limit = page_size(request.args.get('limit'))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+    # Seeks down the primary key, or the (bank, id) index with a bank
+    query = select(IngestBatch).order_by(IngestBatch.id.desc()).limit(limit + 1)
+    if bank:
+        query = query.where(IngestBatch.bank == bank)
+    if cursor:
+        query = query.where(IngestBatch.id < int(cursor))
+    batches = db.session.execute(query).scalars().all()
+
+    next_cursor = str(batches[limit - 1].id) if len(batches) > limit else None
+    return jsonify({'count': len(batches[:limit]), 'next_cursor': next_cursor,
+                    'batches': [batch_json(batch) for batch in batches[:limit]]}), 200
+
+
+# Undo an upload
+@batches_bp.route('/statement/batches/<int:batch_id>/rollback', methods=['POST'])
+def rollback_batch_route(batch_id):
+    """
+    Roll back an upload batch.
+    ---
+    tags:
+      - Upload Batches
+    parameters:
+      - name: batch_id
+        in: path
+        type: integer
+        required: true
+        description: batch_id returned by the upload
+      - in: header
+        name: User-id
+        type: string
+        required: true
+        description: User ID
+
+    responses:
+      200:
+        description: Rows of the batch deleted, and rows later batches also supplied handed over to them
+      400:
+        description: Bad Request - Missing User-id
+      404:
+        description: Batch not found
+      409:
+        description: Batch already rolled back
+      500:
+        description: Internal Server Error - Error rolling back the batch
+    """
+    user_id = request.headers.get('User-id')
+    if not user_id:
+        return jsonify({'error': 'Admin ID Missing'}), 400
+
+    event_type = f"/statement/batches/{batch_id}/rollback"
+    # Row lock, so two rollbacks of the same batch do not both run
+    batch = db.session.get(IngestBatch, batch_id, with_for_update=True)
+    if not batch:
+        db.session.rollback()
+        return jsonify({'error': 'Batch not found'}), 404
+    if batch.rolled_back_time:
+        db.session.rollback()
+        return jsonify({'error': 'Batch already rolled back', **batch_json(batch)}), 409
+
+    try:
+        deleted, handed_over = rollback_batch(batch, user_id)
+    except Exception as e:
+        db.session.rollback()
+        error_message = f"Error rolling back batch {str(e)}"
+        log_data(message=error_message, event_type=event_type, log_level=logging.ERROR)
+        return jsonify({'error': error_message}), 500
+
+    log_data(message=f"Batch {batch_id} rolled back", event_type=event_type, log_level=logging.INFO,
+             additional_context={'bank': batch.bank, 'rows_deleted': deleted, 'rows_handed_over': handed_over,
+                                 'admin_id': user_id})
+    return jsonify({**batch_json(batch), 'message': f'Batch {batch_id} rolled back, {deleted} rows deleted',
+                    'rows_handed_over': [{'batch_id': receiver, 'rows': rows} for receiver, rows in sorted(handed_over.items())]}), 200
@@ -1,10 +1,29 @@
+import hashlib
+import io
+
+import pandas as pd
 from flask_sqlalchemy import SQLAlchemy
+from sqlalchemy import literal, select
+from sqlalchemy.dialects import postgresql, sqlite
 from sqlalchemy.orm import relationship
 
+from config import BULK_INSERT_BATCH_SIZE, BULK_INSERT_METHOD
+
 db = SQLAlchemy()
 
 class IciciStatement(db.Model):
     __tablename__ = 'icici_statements'
+    __table_args__ = (
+        # Keyset pagination of GET /statement/<bank> on (transaction_date, id), alone and under the equality filters
+        db.Index('ix_icici_statements_transaction_date_id', 'transaction_date', 'id'),
+        db.Index('ix_icici_statements_upload_admin_id_transaction_date_id', 'upload_admin_id', 'transaction_date', 'id'),
+        db.Index('ix_icici_statements_status_transaction_date_id', 'status', 'transaction_date', 'id'),
+        db.Index('ix_icici_statements_Ref_or_Cheque_number', 'Ref_or_Cheque_number'),
+        # Substring search of GET /statement/search (pg_trgm)
+        db.Index('ix_icici_statements_Ref_or_Cheque_number_trgm', 'Ref_or_Cheque_number', postgresql_using='gin',
+                 postgresql_ops={'Ref_or_Cheque_number': 'gin_trgm_ops'}),
+        db.Index('ix_icici_statements_description_trgm', 'description', postgresql_using='gin', postgresql_ops={'description': 'gin_trgm_ops'}),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
     transaction_id = db.Column(db.String(60), nullable=True)
@@ -17,10 +36,30 @@ class IciciStatement(db.Model):
     upload_admin_id = db.Column(db.String(50), nullable=True)
     upload_time = db.Column(db.DateTime, nullable=True)
     status = db.Column(db.Boolean, nullable=False, default=False)
+    fingerprint = db.Column(db.String(64), nullable=True, unique=True, index=True)
+    # UTR/RRN found in the narration at ingest
+    reference_token = db.Column(db.String(22), nullable=True, index=True)
+    # Upload that stored the row; a batch rollback deletes through this index
+    batch_id = db.Column(db.Integer, db.ForeignKey('ingest_batches.id'), nullable=True, index=True)
+
+    # Business fields hashed into the fingerprint
+    fingerprint_columns = ('transaction_date', 'transaction_id', 'Ref_or_Cheque_number', 'description',
+                           'credit_or_debit', 'transaction_amount', 'available_amount')
 
 
 class HdfcStatement(db.Model):
     __tablename__ = 'hdfc_statements'
+    __table_args__ = (
+        # Keyset pagination of GET /statement/<bank> on (transaction_date, id), alone and under the equality filters
+        db.Index('ix_hdfc_statements_transaction_date_id', 'transaction_date', 'id'),
+        db.Index('ix_hdfc_statements_upload_admin_id_transaction_date_id', 'upload_admin_id', 'transaction_date', 'id'),
+        db.Index('ix_hdfc_statements_status_transaction_date_id', 'status', 'transaction_date', 'id'),
+        db.Index('ix_hdfc_statements_Ref_or_Cheque_number', 'Ref_or_Cheque_number'),
+        # Substring search of GET /statement/search (pg_trgm)
+        db.Index('ix_hdfc_statements_Ref_or_Cheque_number_trgm', 'Ref_or_Cheque_number', postgresql_using='gin',
+                 postgresql_ops={'Ref_or_Cheque_number': 'gin_trgm_ops'}),
+        db.Index('ix_hdfc_statements_narration_trgm', 'narration', postgresql_using='gin', postgresql_ops={'narration': 'gin_trgm_ops'}),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
     transaction_date = db.Column(db.DateTime, nullable=True)
@@ -32,10 +71,30 @@ class HdfcStatement(db.Model):
     upload_admin_id = db.Column(db.String(50), nullable=True)
     upload_time = db.Column(db.DateTime, nullable=True)
     status = db.Column(db.Boolean, nullable=False, default=False)
+    fingerprint = db.Column(db.String(64), nullable=True, unique=True, index=True)
+    # UTR/RRN found in the narration at ingest
+    reference_token = db.Column(db.String(22), nullable=True, index=True)
+    # Upload that stored the row; a batch rollback deletes through this index
+    batch_id = db.Column(db.Integer, db.ForeignKey('ingest_batches.id'), nullable=True, index=True)
+
+    # Business fields hashed into the fingerprint
+    fingerprint_columns = ('transaction_date', 'narration', 'Ref_or_Cheque_number',
+                           'withdrawal_amount', 'deposit_amount', 'closing_amount')
 
 
 class SbiStatement(db.Model):
     __tablename__ = 'sbi_statements'
+    __table_args__ = (
+        # Keyset pagination of GET /statement/<bank> on (transaction_date, id), alone and under the equality filters
+        db.Index('ix_sbi_statements_transaction_date_id', 'transaction_date', 'id'),
+        db.Index('ix_sbi_statements_upload_admin_id_transaction_date_id', 'upload_admin_id', 'transaction_date', 'id'),
+        db.Index('ix_sbi_statements_status_transaction_date_id', 'status', 'transaction_date', 'id'),
+        db.Index('ix_sbi_statements_Ref_or_Cheque_number', 'Ref_or_Cheque_number'),
+        # Substring search of GET /statement/search (pg_trgm)
+        db.Index('ix_sbi_statements_Ref_or_Cheque_number_trgm', 'Ref_or_Cheque_number', postgresql_using='gin',
+                 postgresql_ops={'Ref_or_Cheque_number': 'gin_trgm_ops'}),
+        db.Index('ix_sbi_statements_description_trgm', 'description', postgresql_using='gin', postgresql_ops={'description': 'gin_trgm_ops'}),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
     transaction_date = db.Column(db.DateTime, nullable=True)
@@ -48,4 +107,271 @@ class SbiStatement(db.Model):
     upload_admin_id = db.Column(db.String(50), nullable=True)
     upload_time = db.Column(db.DateTime, nullable=True)
     status = db.Column(db.Boolean, nullable=False, default=False)
+    fingerprint = db.Column(db.String(64), nullable=True, unique=True, index=True)
+    # UTR/RRN found in the narration at ingest
+    reference_token = db.Column(db.String(22), nullable=True, index=True)
+    # Upload that stored the row; a batch rollback deletes through this index
+    batch_id = db.Column(db.Integer, db.ForeignKey('ingest_batches.id'), nullable=True, index=True)
+
+    # Business fields hashed into the fingerprint
+    fingerprint_columns = ('transaction_date', 'description', 'Ref_or_Cheque_number', 'branch_code',
+                           'withdrawal_amount', 'deposit_amount', 'closing_amount')
+
+
+class UploadedFile(db.Model):
+    __tablename__ = 'uploaded_files'
+    __table_args__ = (db.UniqueConstraint('bank', 'digest'),)
+
+    id = db.Column(db.Integer, primary_key=True)
+    bank = db.Column(db.String(20), nullable=False)
+    digest = db.Column(db.String(64), nullable=False)
+    file_name = db.Column(db.String(255), nullable=True)
+    status_code = db.Column(db.Integer, nullable=False)
+    message = db.Column(db.String(255), nullable=True)
+    rows_inserted = db.Column(db.Integer, nullable=True)
+    upload_admin_id = db.Column(db.String(50), nullable=True)
+    upload_time = db.Column(db.DateTime, nullable=True)
+    batch_id = db.Column(db.Integer, db.ForeignKey('ingest_batches.id'), nullable=True, index=True)
+
+
+class IngestBatch(db.Model):
+    # One stored statement file: what it held, the time of each stage, and the key its rows are stored under
+    __tablename__ = 'ingest_batches'
+    __table_args__ = (
+        # GET /statement/batches, newest first, for every bank or one
+        db.Index('ix_ingest_batches_bank_id', 'bank', 'id'),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    bank = db.Column(db.String(20), nullable=False)
+    digest = db.Column(db.String(64), nullable=True)
+    file_name = db.Column(db.String(255), nullable=True)
+    status_code = db.Column(db.Integer, nullable=True)
+    message = db.Column(db.String(255), nullable=True)
+    rows_parsed = db.Column(db.Integer, nullable=True)
+    rows_inserted = db.Column(db.Integer, nullable=True)
+    rows_before_watermark = db.Column(db.Integer, nullable=True)
+    stage_seconds = db.Column(db.JSON, nullable=True)
+    upload_admin_id = db.Column(db.String(50), nullable=True)
+    upload_time = db.Column(db.DateTime, nullable=True)
+    rolled_back_rows = db.Column(db.Integer, nullable=True)
+    rolled_back_admin_id = db.Column(db.String(50), nullable=True)
+    rolled_back_time = db.Column(db.DateTime, nullable=True)
+
+
+class IngestBatchDuplicate(db.Model):
+    # A row a batch supplied that was already stored under another batch; rolling that batch back hands the row over
+    __tablename__ = 'ingest_batch_duplicates'
+
+    bank = db.Column(db.String(20), primary_key=True)
+    fingerprint = db.Column(db.String(64), primary_key=True)
+    batch_id = db.Column(db.Integer, db.ForeignKey('ingest_batches.id'), primary_key=True, index=True)
+
+
+class UploadJob(db.Model):
+    __tablename__ = 'upload_jobs'
+
+    id = db.Column(db.String(36), primary_key=True)
+    bank = db.Column(db.String(20), nullable=False)
+    file_name = db.Column(db.String(255), nullable=True)
+    path = db.Column(db.String(255), nullable=True)
+    # '<host>:<pid>' of the process whose worker pool holds the job
+    worker = db.Column(db.String(100), nullable=True)
+    state = db.Column(db.String(20), nullable=False, default='queued')
+    status_code = db.Column(db.Integer, nullable=True)
+    result = db.Column(db.JSON, nullable=True)
+    error = db.Column(db.Text, nullable=True)
+    rows_parsed = db.Column(db.Integer, nullable=True)
+    rows_inserted = db.Column(db.Integer, nullable=True)
+    upload_admin_id = db.Column(db.String(50), nullable=True)
+    created_time = db.Column(db.DateTime, nullable=True)
+    started_time = db.Column(db.DateTime, nullable=True)
+    finished_time = db.Column(db.DateTime, nullable=True)
+
+
+class IngestWatermark(db.Model):
+    # Latest transaction stored for the account of each bank; older statement rows are skipped at ingest
+    __tablename__ = 'ingest_watermarks'
+
+    bank = db.Column(db.String(20), primary_key=True)
+    transaction_date = db.Column(db.DateTime, nullable=False)
+    closing_balance = db.Column(db.Numeric(15, 2), nullable=True)
+    updated_time = db.Column(db.DateTime, nullable=True)
+
+
+class DailyAccountSummary(db.Model):
+    # Daily totals and end-of-day balance of each bank, updated by every upload for the days it touched
+    __tablename__ = 'daily_account_summary'
+
+    bank = db.Column(db.String(20), primary_key=True)
+    day = db.Column(db.Date, primary_key=True)
+    deposit_total = db.Column(db.Numeric(15, 2), nullable=False, default=0)
+    deposit_count = db.Column(db.Integer, nullable=False, default=0)
+    withdrawal_total = db.Column(db.Numeric(15, 2), nullable=False, default=0)
+    withdrawal_count = db.Column(db.Integer, nullable=False, default=0)
+    transaction_count = db.Column(db.Integer, nullable=False, default=0)
+    # Balance after the day's last transaction, and that transaction's date
+    closing_balance = db.Column(db.Numeric(15, 2), nullable=True)
+    closing_time = db.Column(db.DateTime, nullable=True)
+
+
+# < ------------------------------row fingerprint ------------------------------------------>
+
+def _fingerprint_part(series, column_type):
+    # Render one business field the same way whether it comes from a statement file or from the table
+    if isinstance(column_type, db.DateTime):
+        text = pd.to_datetime(series).dt.strftime('%Y-%m-%d %H:%M:%S')
+    elif isinstance(column_type, (db.Numeric, db.Float)):
+        text = pd.to_numeric(series).round(2).map('{:.2f}'.format)
+    else:
+        text = series.astype(str).str.strip()
+    return text.where(series.notna(), '')
+
+
+def row_fingerprint(model, df):
+    """
+    Stable sha256 of the normalized business fields of each row, used as the dedup key
+    of the statement tables.
+    """
+    table = model.__table__
+    parts = [_fingerprint_part(df[name], table.c[name].type) for name in model.fingerprint_columns]
+    keys = parts[0].str.cat(parts[1:], sep='|')
+    return keys.map(lambda key: hashlib.sha256(key.encode('utf-8')).hexdigest())
+
+
+def backfill_fingerprints(model, batch_size=None):
+    # One-off fill of rows stored before the fingerprint column existed; duplicates keep a NULL fingerprint.
+    # Rows are read and committed batch_size at a time, paging on id
+    table = model.__table__
+    batch_size = batch_size or BULK_INSERT_BATCH_SIZE
+    query = select(table.c.id, *[table.c[name] for name in model.fingerprint_columns]) \
+        .where(table.c.fingerprint.is_(None), table.c.id > db.bindparam('last_id')).order_by(table.c.id).limit(batch_size)
+
+    updated, last_id = 0, 0
+    while True:
+        batch = pd.read_sql(query, db.session.connection(), params={'last_id': last_id})
+        if batch.empty:
+            break
+        last_id = int(batch['id'].iloc[-1])
+        batch = batch.assign(fingerprint=row_fingerprint(model, batch)).drop_duplicates('fingerprint')
+        taken = db.session.execute(
+            select(table.c.fingerprint).where(table.c.fingerprint.in_(batch['fingerprint'].tolist()))
+        ).scalars().all()
+        batch = batch[~batch['fingerprint'].isin(taken)]
+        if not batch.empty:
+            db.session.execute(
+                table.update().where(table.c.id == db.bindparam('row_id')).values(fingerprint=db.bindparam('row_fingerprint')),
+                [{'row_id': row_id, 'row_fingerprint': fingerprint}
+                 for row_id, fingerprint in zip(batch['id'].tolist(), batch['fingerprint'])]
+            )
+            updated += len(batch)
+        db.session.commit()
+    return updated
+
+
+# < ------------------------------bulk write ------------------------------------------>
+
+def frame_records(df):
+    # NaN/NaT become None so they are written as NULL
+    return df.astype(object).where(df.notna(), None).to_dict('records')
+
+
+def _insert_statement(table):
+    # INSERT ... ON CONFLICT (fingerprint) DO NOTHING, so the unique index does the dedup
+    dialect = db.session.get_bind().dialect.name
+    if dialect == 'postgresql':
+        statement = postgresql.insert(table)
+    elif dialect == 'sqlite':
+        statement = sqlite.insert(table)
+    else:
+        return table.insert()
+    if 'fingerprint' in table.c:
+        statement = statement.on_conflict_do_nothing(index_elements=['fingerprint'])
+    return statement
+
+
+def _insert_values(table, df, batch_size):
+    inserted = 0
+    for start in range(0, len(df), batch_size):
+        statement = _insert_statement(table).values(frame_records(df.iloc[start:start + batch_size]))
+        inserted += len(db.session.execute(statement.returning(table.c.id)).all())
+    return inserted
+
+
+def _insert_executemany(table, df, batch_size):
+    # SQLAlchemy 2.0 turns this into batched multi-row INSERTs (insertmanyvalues) on PostgreSQL
+    inserted = 0
+    statement = _insert_statement(table).returning(table.c.id)
+    for start in range(0, len(df), batch_size):
+        inserted += len(db.session.execute(statement, frame_records(df.iloc[start:start + batch_size])).all())
+    return inserted
+
+
+def _insert_copy(table, df, batch_size):
+    # COPY has no ON CONFLICT, so rows are staged in a temp table and moved with INSERT ... SELECT
+    columns = ', '.join(f'"{column}"' for column in df.columns)
+    staging = f'{table.name}_staging'
+    conflict = ' ON CONFLICT (fingerprint) DO NOTHING' if 'fingerprint' in table.c else ''
+    inserted = 0
+    cursor = db.session.connection().connection.cursor()
+    try:
+        cursor.execute(f'CREATE TEMP TABLE IF NOT EXISTS {staging} (LIKE {table.name} INCLUDING DEFAULTS) ON COMMIT DROP')
+        for start in range(0, len(df), batch_size):
+            buffer = io.StringIO()
+            df.iloc[start:start + batch_size].to_csv(buffer, index=False, header=False)
+            buffer.seek(0)
+            cursor.copy_expert(f'COPY {staging} ({columns}) FROM STDIN WITH (FORMAT csv)', buffer)
+            cursor.execute(f'INSERT INTO {table.name} ({columns}) SELECT {columns} FROM {staging}{conflict}')
+            inserted += cursor.rowcount
+            cursor.execute(f'TRUNCATE {staging}')
+    finally:
+        cursor.close()
+    return inserted
+
+
+BULK_INSERT_METHODS = {
+    'values': _insert_values,
+    'executemany': _insert_executemany,
+    'copy': _insert_copy,
+}
+
+
+def record_batch_duplicates(bank, model, df, batch_id, batch_size=None):
+    """
+    Records the rows of df that bulk_insert skipped because another batch had stored them, so rolling
+    that batch back keeps them under this one. Called when fewer rows were inserted than given.
+    """
+    table = model.__table__
+    duplicates = IngestBatchDuplicate.__table__
+    insert = (postgresql.insert if db.session.get_bind().dialect.name == 'postgresql' else sqlite.insert)(duplicates)
+    fingerprints = df['fingerprint'].drop_duplicates().tolist()
+    batch_size = batch_size or BULK_INSERT_BATCH_SIZE
+    for start in range(0, len(fingerprints), batch_size):
+        taken = select(literal(bank), table.c.fingerprint, literal(batch_id)).where(
+            table.c.fingerprint.in_(fingerprints[start:start + batch_size]), table.c.batch_id != batch_id)
+        db.session.execute(insert.from_select(['bank', 'fingerprint', 'batch_id'], taken).on_conflict_do_nothing())
+
+
+def bulk_insert(model, df, method=None, batch_size=None):
+    """
+    Write a normalized DataFrame (columns named after the model fields) into the model's table
+    inside the current session transaction and return the number of rows actually inserted.
+    Rows whose fingerprint already exists are skipped by the database. The caller commits.
+    """
+    if df.empty:
+        return 0
+
+    method = method or BULK_INSERT_METHOD
+    if method not in BULK_INSERT_METHODS:
+        raise ValueError(f"Unknown bulk insert method: {method}")
+    # COPY is PostgreSQL only
+    if method == 'copy' and db.session.get_bind().dialect.name != 'postgresql':
+        method = 'executemany'
+
+    # Scalar column defaults (e.g. status=False) are applied here so COPY gets them too
+    table = model.__table__
+    defaults = {column.name: column.default.arg for column in table.columns
+                if column.name not in df.columns and column.default is not None and column.default.is_scalar}
+    df = df.assign(**defaults)
 
+    return BULK_INSERT_METHODS[method](table, df, batch_size or BULK_INSERT_BATCH_SIZE)
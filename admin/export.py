@@ -0,0 +1,204 @@
+import csv
+import io
+import logging
+import time
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+from flask import Blueprint, Response, jsonify, request, stream_with_context
+from sqlalchemy import select
+
+from admin.banks import BANK_FORMATS
+from admin.database import db
+from admin.statements import date_filters
+from config import EXPORT_FETCH_ROWS, EXPORT_ROW_GROUP_ROWS
+from logs.log import log_data
+
+# Create a Blueprint instance
+export_bp = Blueprint('export', __name__)
+
+EXPORT_MIMETYPES = {'csv': 'text/csv', 'parquet': 'application/vnd.apache.parquet'}
+
+
+def export_columns(table):
+    # Every stored field but the dedup fingerprint, as on GET /statement/<bank>
+    return [column for column in table.c if column.name != 'fingerprint']
+
+
+def export_partitions(table, filters):
+    """
+    Lists of EXPORT_FETCH_ROWS rows in (transaction_date, id) order, read through a server-side
+    cursor (stream_results), so only one partition of the result is held in memory at a time.
+    """
+    query = select(*export_columns(table)).where(*filters).order_by(table.c.transaction_date, table.c.id)
+    result = db.session.execute(query.execution_options(stream_results=True, yield_per=EXPORT_FETCH_ROWS))
+    try:
+        yield from result.partitions()
+    finally:
+        result.close()
+
+
+# < ------------------------------csv ------------------------------------------>
+
+def csv_chunks(columns, partitions):
+    # Header first, then one encoded chunk per partition
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow([column.name for column in columns])
+    yield buffer.getvalue().encode('utf-8')
+    for rows in partitions:
+        buffer.seek(0)
+        buffer.truncate()
+        writer.writerows(rows)
+        yield buffer.getvalue().encode('utf-8')
+
+
+# < ------------------------------parquet ------------------------------------------>
+
+def arrow_type(column_type):
+    if isinstance(column_type, db.DateTime):
+        return pa.timestamp('us')
+    if isinstance(column_type, db.Numeric) and not isinstance(column_type, db.Float):
+        return pa.decimal128(column_type.precision, column_type.scale)
+    if isinstance(column_type, db.Float):
+        return pa.float64()
+    if isinstance(column_type, db.Boolean):
+        return pa.bool_()
+    if isinstance(column_type, db.Integer):
+        return pa.int64()
+    return pa.string()
+
+
+class ChunkSink(io.RawIOBase):
+    # Write-only file the Parquet writer fills; drain() hands over what was written since the last call
+    def __init__(self):
+        super().__init__()
+        self.chunks, self.position = [], 0
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self.chunks.append(bytes(data))
+        self.position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self.position
+
+    def drain(self):
+        data, self.chunks = b''.join(self.chunks), []
+        return data
+
+
+def arrow_table(schema, rows):
+    # Rows -> Arrow table, column by column
+    columns = zip(*rows)
+    return pa.Table.from_arrays([pa.array(values, type=field.type) for field, values in zip(schema, columns)], schema=schema)
+
+
+def parquet_chunks(columns, partitions):
+    """
+    One row group per EXPORT_ROW_GROUP_ROWS rows, sent as soon as it is written. Each partition is
+    turned into Arrow columns as it arrives, so a pending row group is held in columnar form.
+    """
+    schema = pa.schema([pa.field(column.name, arrow_type(column.type)) for column in columns])
+    sink = ChunkSink()
+    writer = pq.ParquetWriter(sink, schema)
+    # The file magic goes out before the first row group is read
+    yield sink.drain()
+    try:
+        group, group_rows = [], 0
+        for rows in partitions:
+            group.append(arrow_table(schema, rows))
+            group_rows += len(rows)
+            if group_rows >= EXPORT_ROW_GROUP_ROWS:
+                writer.write_table(pa.concat_tables(group), row_group_size=group_rows)
+                group, group_rows = [], 0
+                yield sink.drain()
+        if group:
+            writer.write_table(pa.concat_tables(group), row_group_size=group_rows)
+    finally:
+        writer.close()
+    yield sink.drain()
+
+
+EXPORT_WRITERS = {'csv': csv_chunks, 'parquet': parquet_chunks}
+
+
+def counted(partitions, totals):
+    # Adds the rows of each partition to totals['rows'] as they go by
+    for rows in partitions:
+        totals['rows'] += len(rows)
+        yield rows
+
+
+# Full extract of a bank's transactions, streamed
+@export_bp.route('/statement/<bank>/export', methods=['GET'])
+def export_statements(bank):
+    """
+    Bank statement export.
+    ---
+    tags:
+      - Bank Statements
+    parameters:
+      - name: bank
+        in: path
+        type: string
+        required: true
+        description: Bank of the statement (hdfc, icici, sbi)
+      - name: from
+        in: query
+        type: string
+        description: Transactions on or after this date (YYYY-MM-DD or ISO datetime)
+      - name: to
+        in: query
+        type: string
+        description: Transactions on or before this date (YYYY-MM-DD or ISO datetime)
+      - name: format
+        in: query
+        type: string
+        enum: [csv, parquet]
+        description: File format, csv by default
+
+    responses:
+      200:
+        description: Transactions ordered by transaction date and id, streamed as a CSV or Parquet file
+      400:
+        description: Bad Request - Invalid date or format
+      404:
+        description: Unsupported bank
+    """
+    if bank not in BANK_FORMATS:
+        return jsonify({'error': f'Unsupported bank {bank}'}), 404
+
+    file_format = request.args.get('format', 'csv').lower()
+    if file_format not in EXPORT_WRITERS:
+        return jsonify({'error': f'Invalid format: {file_format}'}), 400
+
+    table = BANK_FORMATS[bank]['model'].__table__
+    try:
+        filters = date_filters(table, request.args, 'from', 'to')
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+    event_type = f"/statement/{bank}/export"
+
+    def generate():
+        totals, start = {'rows': 0}, time.perf_counter()
+        try:
+            partitions = counted(export_partitions(table, filters), totals)
+            yield from EXPORT_WRITERS[file_format](export_columns(table), partitions)
+        except Exception as e:
+            # Headers are already sent, the client sees a truncated file
+            log_data(message=f"Export failed after {totals['rows']} rows {str(e)}", event_type=event_type,
+                     log_level=logging.ERROR)
+            raise
+        log_data(message='Statement export sent', event_type=event_type, log_level=logging.INFO, additional_context={
+            'bank': bank, 'format': file_format, 'rows': totals['rows'], 'seconds': round(time.perf_counter() - start, 3),
+        })
+
+    # The app context (and the session's connection) stays open until the last chunk is sent
+    return Response(stream_with_context(generate()), mimetype=EXPORT_MIMETYPES[file_format], headers={
+        'Content-Disposition': f'attachment; filename={bank}_statements.{file_format}',
+    })
@@ -0,0 +1,360 @@
+import logging
+import time
+from itertools import islice
+
+import numpy as np
+import pandas as pd
+
+from admin.banks import BANK_FORMATS
+from admin.database import (
+    IngestBatch, IngestWatermark, UploadedFile, bulk_insert, db, record_batch_duplicates, row_fingerprint,
+)
+from admin.metrics import record_upload, timed, timed_iter
+from admin.readers import iter_sheet_rows, statement_reader
+from admin.search import reference_tokens
+from admin.summary import add_batch_to_summary
+from admin.watermarks import advance_watermark, balance_gap, ingest_since, newest_first, new_balance_trail, track_balances
+from admin.utils import (
+    clean_text, current_datetime, file_digest, file_size, open_statement, validate_account, validate_columns,
+)
+from logs.log import log_data
+
+
+def process_statement_file(bank, file, user_id, use_watermark=True):
+    """
+    Runs the statement pipeline of a registered bank; returns the response body and status code.
+    With use_watermark, rows dated before the day of the bank's ingest watermark are skipped and a file
+    already uploaded gets its original result; without it every row of the file is read.
+    """
+    timings, counts = {}, {}
+    start = time.perf_counter()
+    result, status_code = _run_pipeline(bank, file, user_id, use_watermark, timings, counts)
+    record_upload(bank, status_code, time.perf_counter() - start, timings, counts)
+    return result, status_code
+
+
+def _run_pipeline(bank, file, user_id, use_watermark, timings, counts):
+    # timings collects seconds per stage, counts the file size and row counts, for the metrics
+    bank_format = BANK_FORMATS[bank]
+    model = bank_format['model']
+    event_type = f"/statement/{bank}"
+    try:
+        counts['bytes'] = file_size(file)
+
+        # An identical file was already processed for this bank, answer with its original result;
+        # a full read (?full=true) parses it again
+        with timed(timings, 'digest'):
+            digest = file_digest(file)
+        with timed(timings, 'duplicate_check'):
+            uploaded_file = UploadedFile.query.filter_by(bank=bank, digest=digest).first()
+        if uploaded_file and use_watermark:
+            log_data(message='Duplicate file upload, returning the original result', event_type=event_type, log_level=logging.INFO)
+            return {'message': uploaded_file.message, 'duplicate_file': True, 'batch_id': uploaded_file.batch_id}, \
+                uploaded_file.status_code
+
+        # Reader backend from the file's first bytes, whatever its name
+        reader = statement_reader(file)
+        if reader is None:
+            return {'error': 'File is not an Excel workbook (.xls or .xlsx)'}, 400
+
+        # Validate the file with bank details account and name
+        message, chunks = open_validated_statement(bank, file, reader, timings)
+        if message:
+            return {'error': message}, 400
+
+        # Rows before the watermark's day are dropped as soon as their dates are parsed; the rest of each chunk
+        # is normalized, fingerprinted and written on its own, duplicates (already stored rows) being skipped
+        # by the unique fingerprint index
+        watermark = db.session.get(IngestWatermark, bank) if use_watermark else None
+        trail = new_balance_trail(watermark)
+        rows_parsed, inserted, upload_time = 0, 0, current_datetime()
+        # The batch row is written first so the statement rows can carry its id
+        batch = IngestBatch(bank=bank, digest=digest, file_name=file.filename, upload_admin_id=user_id, upload_time=upload_time)
+        db.session.add(batch)
+        db.session.flush()
+        date_formats, invalid_dates, skipped = {}, [], {}
+        for transaction_data_df in parsed_chunks(bank, chunks, timings, date_formats, invalid_dates,
+                                                 ingest_since(watermark), skipped):
+            rows_parsed += len(transaction_data_df)
+            track_balances(bank_format, transaction_data_df, trail)
+            # Once a bad date is found in a strict bank the file is rejected; the remaining chunks are
+            # only parsed so every bad cell is reported at once
+            if invalid_dates and bank_format['date_errors'] == 'raise':
+                continue
+            with timed(timings, 'insert'):
+                chunk_inserted = bulk_insert(model, transaction_data_df.assign(upload_admin_id=user_id, upload_time=upload_time,
+                                                                               batch_id=batch.id))
+                if chunk_inserted < len(transaction_data_df):
+                    record_batch_duplicates(bank, model, transaction_data_df, batch.id)
+            inserted += chunk_inserted
+
+        if invalid_dates and bank_format['date_errors'] == 'raise':
+            db.session.rollback()
+            message = f"Unparseable dates in {len(invalid_dates)} cell(s)"
+            log_data(message=message, event_type=event_type, log_level=logging.ERROR)
+            return {'error': message, 'invalid_dates': invalid_dates[:INVALID_DATES_REPORTED]}, 400
+
+        rows_before_watermark = skipped.get('rows_before_watermark', 0)
+        rows_parsed += rows_before_watermark
+        if inserted:
+            status_code, message = 201, f"{bank_format['name']} file data successfully stored in the database"
+        else:
+            status_code, message = 200, 'No new unique transactions to store'
+
+        if inserted:
+            with timed(timings, 'summary'):
+                add_batch_to_summary(bank, batch.id, newest_first(trail))
+
+        gap = balance_gap(trail)
+        stage_seconds = {stage: round(seconds, 4) for stage, seconds in timings.items()}
+        with timed(timings, 'commit'):
+            advance_watermark(bank, trail)
+            batch.status_code, batch.message, batch.stage_seconds = status_code, message, stage_seconds
+            batch.rows_parsed, batch.rows_inserted, batch.rows_before_watermark = rows_parsed, inserted, rows_before_watermark
+            # A full read (?full=true) of a recorded file takes over its record when it stored rows
+            if uploaded_file is None or inserted:
+                if uploaded_file is None:
+                    uploaded_file = UploadedFile(bank=bank, digest=digest)
+                    db.session.add(uploaded_file)
+                uploaded_file.file_name, uploaded_file.status_code, uploaded_file.message = file.filename, status_code, message
+                uploaded_file.rows_inserted, uploaded_file.upload_admin_id = inserted, user_id
+                uploaded_file.upload_time, uploaded_file.batch_id = current_datetime(), batch.id
+            db.session.commit()
+        counts.update(rows_parsed=rows_parsed, rows_inserted=inserted)
+
+        log_data(message=message, event_type=event_type, log_level=logging.INFO, additional_context={
+            'bank': bank, 'bytes': counts['bytes'], 'rows_parsed': rows_parsed, 'rows_inserted': inserted,
+            'rows_skipped': rows_parsed - inserted, 'rows_before_watermark': rows_before_watermark,
+            'batch_id': batch.id, 'stage_seconds': {stage: round(seconds, 4) for stage, seconds in timings.items()},
+        })
+        result = {'message': message, 'batch_id': batch.id, 'rows_parsed': rows_parsed, 'rows_inserted': inserted,
+                  'rows_before_watermark': rows_before_watermark}
+        if gap:
+            log_data(message="Statement does not continue from the stored closing balance", event_type=event_type,
+                     log_level=logging.WARNING, additional_context={'bank': bank, 'balance_gap': gap})
+            result['balance_gap'] = gap
+        if invalid_dates:
+            log_data(message=f"Unparseable dates stored as NULL in {len(invalid_dates)} cell(s)",
+                     event_type=event_type, log_level=logging.WARNING)
+            result['invalid_dates'] = invalid_dates[:INVALID_DATES_REPORTED]
+        return result, status_code
+
+
+    except Exception as e:
+        db.session.rollback()
+        error_message = f"Error processing file upload for bank {str(e)}"
+        log_data(message = error_message, event_type=event_type, log_level=logging.ERROR)
+        return {'error': error_message}, 500
+
+
+def open_validated_statement(bank, file, reader, timings):
+    # (error message, None) when the account details or the columns are not the bank's, else (None, raw chunks)
+    bank_format = BANK_FORMATS[bank]
+    with timed(timings, 'read'):
+        head, columns, chunks = open_statement(file, reader, bank_format['header_row'], bank_format['head_rows'])
+    with timed(timings, 'validate_account'):
+        valid, message = validate_account(bank_format, head)
+    if not valid:
+        return message, None
+
+    with timed(timings, 'validate_columns'):
+        valid, message = validate_columns(bank_format, columns.map(strip_column))
+    if not valid:
+        return message, None
+    return None, chunks
+
+
+def parsed_chunks(bank, chunks, timings, date_formats, invalid_dates, since=None, counts=None):
+    """
+    Raw chunks -> normalized, fingerprinted transaction chunks ready for bulk_insert. Rows dated
+    before since are dropped and counted in counts['rows_before_watermark'].
+    """
+    model = BANK_FORMATS[bank]['model']
+    for df in timed_iter(timings, 'read', transaction_rows(BANK_FORMATS[bank], chunks)):
+        with timed(timings, 'normalize'):
+            transaction_data_df = normalize(bank, df, date_formats, invalid_dates, since)
+        if counts is not None:
+            counts['rows_before_watermark'] = counts.get('rows_before_watermark', 0) + len(df) - len(transaction_data_df)
+        if transaction_data_df.empty:
+            continue
+        with timed(timings, 'fingerprint'):
+            transaction_data_df['fingerprint'] = row_fingerprint(model, transaction_data_df)
+        yield transaction_data_df
+
+
+def detect_bank(file, reader):
+    # First bank whose account details are in the header block of the statement, None when there is none
+    rows = iter_sheet_rows(file, reader)
+    try:
+        head = pd.DataFrame(list(islice(rows, max(bank_format['head_rows'] for bank_format in BANK_FORMATS.values()))))
+    finally:
+        rows.close()
+        file.stream.seek(0)
+    for bank, bank_format in BANK_FORMATS.items():
+        valid, _ = validate_account(bank_format, head)
+        if valid:
+            return bank
+    return None
+
+
+def strip_column(name):
+    return name.strip() if isinstance(name, str) else name
+
+
+# < ------------------------------transaction rows ------------------------------------------>
+
+def empty_rows(df):
+    return df.isna().to_numpy().all(axis=1)
+
+
+def marker_rows(df, marker):
+    # Rows where every cell contains the marker text, found on the whole block at once
+    cells = df.to_numpy(dtype=str)
+    return (np.char.find(cells, marker) >= 0).all(axis=1)
+
+
+def between_markers(chunks, marker):
+    # Transactions sit between the first two marker rows; yields them chunk by chunk
+    started = False
+    for df in chunks:
+        positions = marker_rows(df, marker).nonzero()[0]
+        if not started:
+            if not len(positions):
+                continue
+            started = True
+            df, positions = df.iloc[positions[0] + 1:], positions[1:] - positions[0] - 1
+        if len(positions):
+            yield df.iloc[:positions[0]]
+            return
+        yield df
+
+
+def before_footer(chunks):
+    # The statement footer follows the last empty row. The first block of rows is always transactions;
+    # any later block is held back until another empty row shows it is not the footer.
+    held, first_block, after_empty, seen_rows = [], True, False, False
+    for df in chunks:
+        empty = empty_rows(df)
+        start = 0
+        for end in [*empty.nonzero()[0], len(df)]:
+            block = df.iloc[start:end]
+            if len(block):
+                if after_empty:
+                    yield from held
+                    held, first_block, after_empty = [], False, False
+                if first_block:
+                    yield block
+                else:
+                    held.append(block)
+                seen_rows = True
+            if end < len(df) and seen_rows:
+                after_empty = True
+            start = end + 1
+
+
+def transaction_rows(bank_format, chunks):
+    # Raw data chunks -> chunks holding only the transaction rows of the statement
+    chunks = (df.rename(columns=strip_column) for df in chunks)
+    if bank_format['boundary_marker']:
+        chunks = between_markers(chunks, bank_format['boundary_marker'])
+    if bank_format['footer_after_empty_row']:
+        chunks = before_footer(chunks)
+    for df in chunks:
+        df = df[~empty_rows(df)]
+        if len(df):
+            yield df
+
+
+def normalize(bank, df, date_formats, invalid_dates, since=None):
+    """
+    Statement columns -> model fields, each converted by the type of the field it is stored in.
+    With since, rows dated before it are dropped once the dates are parsed, before the other fields.
+    """
+    bank_format = BANK_FORMATS[bank]
+    table = bank_format['model'].__table__
+    data = {}
+    for field, column in bank_format['columns'].items():
+        if isinstance(table.c[field].type, db.DateTime):
+            data[field] = parse_dates(bank, column, df[column], date_formats, invalid_dates)
+    if since is not None:
+        keep = (data['transaction_date'].isna() | (data['transaction_date'] >= since)).to_numpy()
+        df = df[keep]
+        data = {field: values[keep] for field, values in data.items()}
+
+    for field, column in bank_format['columns'].items():
+        column_type = table.c[field].type
+        if isinstance(column_type, db.DateTime):
+            continue
+        elif isinstance(column_type, (db.Numeric, db.Float)):
+            errors = 'coerce' if column in bank_format['coerce_columns'] else 'raise'
+            data[field] = pd.to_numeric(df[column], errors=errors)
+        else:
+            data[field] = clean_text(df[column])
+    data['reference_token'] = reference_tokens(data[bank_format['narration_column']])
+    return pd.DataFrame(data, index=df.index)
+
+
+# < ------------------------------date normalization ------------------------------------------>
+
+# Text cells checked when detecting the date format of a file
+DATE_SAMPLE_ROWS = 50
+# Bad date cells listed in a response; the count covers all of them
+INVALID_DATES_REPORTED = 100
+
+# (bank, column) -> date format a previous statement was unambiguously detected in; only breaks a tie
+# between formats that parse the same part of a sample none of them fits entirely
+_detected_date_formats = {}
+
+
+def _month_first(date_format):
+    return '%m' in date_format and date_format.index('%m') < date_format.index('%d')
+
+
+def detect_date_format(bank, column, values):
+    """
+    Format of the bank's date_formats parsing the most cells of a sample of the column; on a tie the
+    first of them in the bank's order, so a sample that fits both 01/04/2024 readings is day-first.
+    """
+    known = BANK_FORMATS[bank]['date_formats']
+    sample = values.head(DATE_SAMPLE_ROWS)
+    parsed = {date_format: pd.to_datetime(sample, format=date_format, errors='coerce').notna().sum() for date_format in known}
+    most = max(parsed.values())
+    if not most:
+        return None
+
+    tied = [date_format for date_format in known if parsed[date_format] == most]
+    best_format, cached = tied[0], _detected_date_formats.get((bank, column))
+    if most < len(sample) and cached in tied and not (_month_first(cached) and not _month_first(best_format)):
+        best_format = cached
+    if most == len(sample) and len(tied) == 1:
+        _detected_date_formats[(bank, column)] = best_format
+    return best_format
+
+
+def parse_dates(bank, column, series, date_formats, invalid_dates):
+    """
+    Whole-column date conversion with one explicit format, detected on the first chunk of the file
+    and kept in date_formats. Cells already read as dates by Excel pass through. Non-empty cells
+    that do not parse become NaT and are added to invalid_dates.
+    """
+    is_text = series.map(type).eq(str).to_numpy()
+    text = series[is_text].str.strip()
+    blank = pd.Series(False, index=series.index)
+    blank[is_text] = text.eq('').to_numpy()
+
+    parsed = pd.Series(pd.NaT, index=series.index, dtype='datetime64[ns]')
+    if (~is_text).any():
+        parsed[~is_text] = pd.to_datetime(series[~is_text], errors='coerce')
+
+    text = text[text.ne('')]
+    if len(text):
+        if column not in date_formats:
+            date_formats[column] = detect_date_format(bank, column, text)
+        if date_formats[column]:
+            parsed[text.index] = pd.to_datetime(text, format=date_formats[column], errors='coerce')
+
+    invalid = series.notna() & parsed.isna() & ~blank
+    if invalid.any():
+        invalid_dates.extend({'row': int(row), 'column': column, 'value': str(value)}
+                             for row, value in series[invalid].items())
+    return parsed
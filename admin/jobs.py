@@ -0,0 +1,168 @@
+import logging
+import os
+import socket
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+from flask import Blueprint, current_app, jsonify, request
+from werkzeug.datastructures import FileStorage
+
+from admin.admission import upload_admission
+from admin.database import UploadJob, db
+from admin.ingest import process_statement_file
+from admin.utils import current_datetime
+from config import ASYNC_UPLOADS, UPLOAD_JOB_DIR, UPLOAD_WORKERS
+from logs.log import log_data
+
+# Create a Blueprint instance
+jobs_bp = Blueprint('jobs', __name__)
+
+_executor = None
+
+
+def async_requested():
+    value = request.args.get('async')
+    if value is None:
+        return ASYNC_UPLOADS
+    return value.lower() in ('1', 'true', 'yes')
+
+
+def _get_executor():
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(max_workers=UPLOAD_WORKERS, thread_name_prefix='upload-job')
+    return _executor
+
+
+def worker_id():
+    return f'{socket.gethostname()}:{os.getpid()}'
+
+
+def _process_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def fail_stale_jobs():
+    """
+    Fail the queued and running jobs of worker processes of this host that are gone, e.g. recycled by
+    gunicorn's max_requests or killed after graceful_timeout, and remove their spooled files.
+    Jobs are held in memory by the process that took the upload, so nothing else would ever finish them.
+    Jobs recorded without a worker (before the column was added) are failed as well.
+    Run at the start of each worker process, before it takes uploads; returns the ids of the failed jobs.
+    """
+    host = socket.gethostname()
+    stale = []
+    for job in UploadJob.query.filter(UploadJob.state.in_(('queued', 'running'))):
+        if job.worker:
+            job_host, _, pid = job.worker.rpartition(':')
+            if job_host != host or (int(pid) != os.getpid() and _process_alive(int(pid))):
+                continue
+        stale.append(job)
+
+    for job in stale:
+        if job.path and os.path.exists(job.path):
+            os.remove(job.path)
+        job.state = 'failed'
+        job.status_code = 500
+        job.error = 'Upload job stopped with its worker process; upload the file again'
+        job.finished_time = current_datetime()
+    db.session.commit()
+
+    if stale:
+        log_data(message=f"Failed {len(stale)} upload jobs of stopped workers: {', '.join(job.id for job in stale)}",
+                 event_type="/statement/jobs", log_level=logging.WARNING)
+    return [job.id for job in stale]
+
+
+def enqueue_upload(bank, file, user_id, use_watermark=True):
+    # Save the upload to disk, record the job and hand it to the worker pool; returns the job id
+    os.makedirs(UPLOAD_JOB_DIR, exist_ok=True)
+    job_id = str(uuid.uuid4())
+    path = os.path.join(UPLOAD_JOB_DIR, job_id + os.path.splitext(file.filename)[1])
+    file.save(path)
+
+    job = UploadJob(id=job_id, bank=bank, file_name=file.filename, path=path, worker=worker_id(),
+                    state='queued', upload_admin_id=user_id, created_time=current_datetime())
+    db.session.add(job)
+    db.session.commit()
+
+    _get_executor().submit(_run_job, current_app._get_current_object(), job_id, use_watermark)
+    return job_id
+
+
+def _run_job(app, job_id, use_watermark):
+    with app.app_context():
+        job = db.session.get(UploadJob, job_id)
+        job.state = 'running'
+        job.started_time = current_datetime()
+        db.session.commit()
+
+        try:
+            # Background jobs share the parse slots of the process and wait for theirs
+            with upload_admission(os.path.getsize(job.path), wait=None), open(job.path, 'rb') as stream:
+                file = FileStorage(stream=stream, filename=job.file_name)
+                result, status_code = process_statement_file(job.bank, file, job.upload_admin_id, use_watermark)
+            job.state = 'done' if status_code < 400 else 'failed'
+            job.status_code = status_code
+            job.result = result
+            job.error = result.get('error')
+            job.rows_parsed = result.get('rows_parsed')
+            job.rows_inserted = result.get('rows_inserted')
+        except Exception as e:
+            db.session.rollback()
+            job.state = 'failed'
+            job.status_code = 500
+            job.error = str(e)
+            log_data(message=f"Upload job {job_id} failed {str(e)}", event_type="/statement/jobs", log_level=logging.ERROR)
+        finally:
+            if os.path.exists(job.path):
+                os.remove(job.path)
+
+        job.finished_time = current_datetime()
+        db.session.commit()
+
+
+@jobs_bp.route('/statement/jobs/<job_id>', methods=['GET'])
+def upload_job_status(job_id):
+    """
+    Background upload job status.
+    ---
+    tags:
+      - Upload Jobs
+    parameters:
+      - name: job_id
+        in: path
+        type: string
+        required: true
+        description: Job ID returned by an async upload
+
+    responses:
+      200:
+        description: Job state, row counts and errors
+      404:
+        description: Job not found
+    """
+    job = db.session.get(UploadJob, job_id)
+    if not job:
+        return jsonify({'error': 'Job not found'}), 404
+
+    return jsonify({
+        'job_id': job.id,
+        'bank': job.bank,
+        'file_name': job.file_name,
+        'state': job.state,
+        'status_code': job.status_code,
+        'result': job.result,
+        'error': job.error,
+        'rows_parsed': job.rows_parsed,
+        'rows_inserted': job.rows_inserted,
+        'created_time': job.created_time.isoformat() if job.created_time else None,
+        'started_time': job.started_time.isoformat() if job.started_time else None,
+        'finished_time': job.finished_time.isoformat() if job.finished_time else None,
+    }), 200
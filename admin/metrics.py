@@ -0,0 +1,130 @@
+import threading
+import time
+from contextlib import contextmanager
+
+from flask import Blueprint, Response
+
+# Create a Blueprint instance
+metrics_bp = Blueprint('metrics', __name__)
+
+SECONDS_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120)
+BYTES_BUCKETS = (10 * 1024, 100 * 1024, 1024 ** 2, 5 * 1024 ** 2, 10 * 1024 ** 2, 50 * 1024 ** 2, 100 * 1024 ** 2)
+
+# name -> (type, help, histogram buckets)
+METRICS = {
+    'statement_uploads_total': ('counter', 'Statement uploads by bank and response status', None),
+    'statement_rows_parsed_total': ('counter', 'Transaction rows read from statements', None),
+    'statement_rows_inserted_total': ('counter', 'Transaction rows stored', None),
+    'statement_rows_skipped_total': ('counter', 'Transaction rows skipped as already stored', None),
+    'statement_upload_bytes': ('histogram', 'Size of the uploaded statement files', BYTES_BUCKETS),
+    'statement_upload_seconds': ('histogram', 'Time to process a statement upload', SECONDS_BUCKETS),
+    'statement_stage_seconds': ('histogram', 'Time spent in each stage of a statement upload', SECONDS_BUCKETS),
+    'statement_admission_wait_seconds': ('histogram', 'Time uploads waited for a parse slot', SECONDS_BUCKETS),
+    'statement_uploads_rejected_total': ('counter', 'Uploads turned away with a 503 by admission control', None),
+}
+
+_lock = threading.Lock()
+# (name, sorted label items) -> value for counters, [bucket counts, sum, count] for histograms
+_values = {}
+
+
+def inc(name, value=1, **labels):
+    key = (name, tuple(sorted(labels.items())))
+    with _lock:
+        _values[key] = _values.get(key, 0) + value
+
+
+def observe(name, value, **labels):
+    buckets = METRICS[name][2]
+    key = (name, tuple(sorted(labels.items())))
+    with _lock:
+        histogram = _values.setdefault(key, [[0] * len(buckets), 0.0, 0])
+        for index, bound in enumerate(buckets):
+            if value <= bound:
+                histogram[0][index] += 1
+        histogram[1] += value
+        histogram[2] += 1
+
+
+@contextmanager
+def timed(timings, stage):
+    # Adds the time spent in the block to timings[stage]
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        timings[stage] = timings.get(stage, 0.0) + time.perf_counter() - start
+
+
+def timed_iter(timings, stage, iterable):
+    # Charges the time spent producing each item (e.g. reading the next chunk) to timings[stage]
+    iterator = iter(iterable)
+    while True:
+        with timed(timings, stage):
+            item = next(iterator, None)
+        if item is None:
+            return
+        yield item
+
+
+def record_upload(bank, status_code, seconds, timings, counts):
+    """
+    Fold one statement upload into the metrics: its status, total and per-stage durations, file size
+    and row counts (rows_parsed, rows_inserted, bytes in counts).
+    """
+    inc('statement_uploads_total', bank=bank, status=str(status_code))
+    observe('statement_upload_seconds', seconds, bank=bank)
+    for stage, stage_seconds in timings.items():
+        observe('statement_stage_seconds', stage_seconds, bank=bank, stage=stage)
+    if 'bytes' in counts:
+        observe('statement_upload_bytes', counts['bytes'], bank=bank)
+    if 'rows_parsed' in counts:
+        inc('statement_rows_parsed_total', counts['rows_parsed'], bank=bank)
+        inc('statement_rows_inserted_total', counts['rows_inserted'], bank=bank)
+        inc('statement_rows_skipped_total', counts['rows_parsed'] - counts['rows_inserted'], bank=bank)
+
+
+def _label_text(labels):
+    if not labels:
+        return ''
+    return '{' + ','.join('{}="{}"'.format(name, str(value).replace('\\', '\\\\').replace('"', '\\"'))
+                          for name, value in labels) + '}'
+
+
+def render():
+    # Prometheus text exposition format (version 0.0.4)
+    with _lock:
+        values = {key: (list(value[0]), value[1], value[2]) if isinstance(value, list) else value
+                  for key, value in _values.items()}
+
+    lines = []
+    for name, (metric_type, help_text, buckets) in METRICS.items():
+        lines.append(f'# HELP {name} {help_text}')
+        lines.append(f'# TYPE {name} {metric_type}')
+        for (metric, labels), value in sorted(values.items()):
+            if metric != name:
+                continue
+            if metric_type == 'counter':
+                lines.append(f'{name}{_label_text(labels)} {value}')
+                continue
+            bucket_counts, total, count = value
+            for bound, bucket_count in zip(buckets, bucket_counts):
+                lines.append(f'{name}_bucket{_label_text(labels + (("le", bound),))} {bucket_count}')
+            lines.append(f'{name}_bucket{_label_text(labels + (("le", "+Inf"),))} {count}')
+            lines.append(f'{name}_sum{_label_text(labels)} {total}')
+            lines.append(f'{name}_count{_label_text(labels)} {count}')
+    return '\n'.join(lines) + '\n'
+
+
+@metrics_bp.route('/metrics', methods=['GET'])
+def metrics():
+    """
+    Upload metrics in Prometheus text format. Each worker process reports its own numbers.
+    ---
+    tags:
+      - Metrics
+    responses:
+      200:
+        description: Counters and histograms of statement uploads
+    """
+    return Response(render(), mimetype='text/plain; version=0.0.4')
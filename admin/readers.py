@@ -0,0 +1,172 @@
+import importlib.util
+import os
+from contextlib import nullcontext
+
+import openpyxl
+import pandas as pd
+
+from config import XLS_READER, XLSX_READER
+
+# First bytes of each statement format: .xlsx is a zip package, .xls an OLE2 compound file
+FILE_SIGNATURES = {
+    'xlsx': b'PK\x03\x04',
+    'xls': b'\xd0\xcf\x11\xe0\xa1\xb1\x1a\xe1',
+}
+
+# Reader setting of config.py per format
+CONFIGURED_READERS = {'xlsx': XLSX_READER, 'xls': XLS_READER}
+
+
+def statement_source(file):
+    # Path of the file on disk behind the upload (spooled request file, upload job, backfill file) or its stream
+    stream = file.stream
+    name = getattr(stream, 'name', None)
+    if isinstance(name, str) and os.path.isfile(name):
+        stream.flush()
+        return name
+    return stream
+
+
+def statement_format(file):
+    # 'xlsx' or 'xls' from the magic bytes of the file, whatever its name; None for anything else
+    head = file.stream.read(max(len(signature) for signature in FILE_SIGNATURES.values()))
+    file.stream.seek(0)
+    for file_format, signature in FILE_SIGNATURES.items():
+        if head.startswith(signature):
+            return file_format
+    return None
+
+
+# < ------------------------------openpyxl ------------------------------------------>
+
+def _openpyxl_grid(file):
+    return pd.read_excel(statement_source(file), engine='openpyxl', header=None)
+
+
+def _source_handle(file):
+    # Binary file object of the statement: openpyxl and calamine go by the extension of a path they are given
+    source = statement_source(file)
+    return open(source, 'rb') if isinstance(source, str) else nullcontext(source)
+
+
+def _openpyxl_rows(file):
+    with _source_handle(file) as handle:
+        book = openpyxl.load_workbook(handle, read_only=True, data_only=True)
+        try:
+            yield from book.worksheets[0].iter_rows(values_only=True)
+        finally:
+            book.close()
+
+
+# < ------------------------------xlrd ------------------------------------------>
+
+def _xlrd_grid(file):
+    return pd.read_excel(statement_source(file), engine='xlrd', header=None)
+
+
+def _xlrd_rows(file):
+    # .xls is capped at 65536 rows; no DataFrame copy of the sheet is made
+    import xlrd
+
+    def value(cell, datemode):
+        # Same cell conversion as pandas' xlrd reader
+        if cell.ctype == xlrd.XL_CELL_DATE:
+            return xlrd.xldate.xldate_as_datetime(cell.value, datemode)
+        if cell.ctype == xlrd.XL_CELL_BOOLEAN:
+            return bool(cell.value)
+        if cell.ctype == xlrd.XL_CELL_NUMBER and float(cell.value).is_integer():
+            return int(cell.value)
+        if cell.ctype in (xlrd.XL_CELL_EMPTY, xlrd.XL_CELL_BLANK, xlrd.XL_CELL_ERROR) or cell.value == '':
+            return None
+        return cell.value
+
+    source = statement_source(file)
+    if isinstance(source, str):
+        # xlrd memory-maps a file it opens by path
+        book = xlrd.open_workbook(source, on_demand=True)
+    else:
+        book = xlrd.open_workbook(file_contents=source.read(), on_demand=True)
+    try:
+        sheet = book.sheet_by_index(0)
+        for index in range(sheet.nrows):
+            yield tuple(value(cell, book.datemode) for cell in sheet.row(index))
+    finally:
+        book.release_resources()
+
+
+# < ------------------------------calamine ------------------------------------------>
+
+def _calamine_grid(file):
+    return pd.read_excel(statement_source(file), engine='calamine', header=None)
+
+
+def _calamine_rows(file):
+    # The sheet is parsed natively (Rust); rows are converted to Python one at a time
+    from python_calamine import CalamineWorkbook
+
+    def value(cell):
+        # Same cell conversion as the other readers: whole floats as int, empty cells as None
+        if isinstance(cell, float) and cell.is_integer():
+            return int(cell)
+        if cell == '':
+            return None
+        return cell
+
+    with _source_handle(file) as handle:
+        book = CalamineWorkbook.from_filelike(handle)
+    try:
+        sheet = book.get_sheet_by_index(0)
+        # Rows and columns before the first used cell are left out by calamine
+        first_row, first_column = sheet.start or (0, 0)
+        for _ in range(first_row):
+            yield ()
+        padding = (None,) * first_column
+        for row in sheet.iter_rows():
+            yield padding + tuple(value(cell) for cell in row)
+    finally:
+        book.close()
+
+
+# Reader backends: formats they read, whole-sheet DataFrame reader, row iterator, module they need.
+# 'auto' takes the first installed backend of AUTO_READERS that reads the format.
+READER_BACKENDS = {
+    'openpyxl': {'formats': {'xlsx'}, 'grid': _openpyxl_grid, 'rows': _openpyxl_rows, 'module': 'openpyxl'},
+    'xlrd': {'formats': {'xls'}, 'grid': _xlrd_grid, 'rows': _xlrd_rows, 'module': 'xlrd'},
+    'calamine': {'formats': {'xlsx', 'xls'}, 'grid': _calamine_grid, 'rows': _calamine_rows, 'module': 'python_calamine'},
+}
+AUTO_READERS = ['calamine', 'openpyxl', 'xlrd']
+
+
+def reader_installed(reader):
+    return importlib.util.find_spec(READER_BACKENDS[reader]['module']) is not None
+
+
+def statement_reader(file):
+    """
+    Reader backend for the file, from its magic bytes and the XLSX_READER / XLS_READER settings;
+    None when the file is not an .xlsx or .xls workbook.
+    """
+    file_format = statement_format(file)
+    if file_format is None:
+        return None
+
+    configured = CONFIGURED_READERS[file_format]
+    if configured != 'auto':
+        if configured not in READER_BACKENDS or file_format not in READER_BACKENDS[configured]['formats']:
+            raise ValueError(f"Reader {configured} cannot read .{file_format} files")
+        return configured
+    return next(reader for reader in AUTO_READERS
+                if file_format in READER_BACKENDS[reader]['formats'] and reader_installed(reader))
+
+
+def read_statement(file, reader):
+    # Parse the workbook a single time; the header block and the data block are both sliced from this grid
+    return READER_BACKENDS[reader]['grid'](file)
+
+
+def iter_sheet_rows(file, reader):
+    """
+    Yield the rows of the first sheet as tuples without building the workbook object model.
+    Empty rows are kept, as pd.read_excel keeps them, so row numbers line up with HDFC_ROW etc.
+    """
+    yield from READER_BACKENDS[reader]['rows'](file)
@@ -0,0 +1,255 @@
+import logging
+
+import pandas as pd
+from dateutil import tz
+from flask import Blueprint, jsonify, request
+from sqlalchemy import any_, func, select
+from sqlalchemy.dialects import postgresql
+
+from admin.banks import BANK_FORMATS
+from admin.database import db
+from admin.search import reference_tokens
+from config import RECONCILE_MAX_PAYMENTS, RECONCILE_WINDOW_DAYS
+from logs.log import log_data
+
+# Create a Blueprint instance
+reconcile_bp = Blueprint('reconcile', __name__)
+
+# Columns of load_credits when no bank has a credit in the range
+CREDIT_DTYPES = {'id': 'int64', 'transaction_date': 'datetime64[ns]', 'amount': 'float64',
+                 'reference': 'object', 'reference_token': 'object', 'bank': 'object'}
+
+
+def parse_payments(payments):
+    """
+    Expected payments (amount, ISO 8601 date, optional reference and id) -> DataFrame with amount in paise,
+    plus the list of entries that could not be parsed.
+    """
+    df = pd.DataFrame(payments, columns=['id', 'amount', 'date', 'reference'])
+    df['id'] = [index if pd.isna(value) else value for index, value in enumerate(df['id'])]
+    amount = pd.to_numeric(df['amount'], errors='coerce')
+    df['date'] = parse_dates(df['date'])
+    invalid = amount.isna() | df['date'].isna()
+    df['cents'] = (amount * 100).round().astype('Int64')
+    df['reference'] = normalize_reference(df['reference'])
+    # 'UTR...' / 'RRN...' references also match the bare token stored at ingest
+    df['reference_token'] = normalize_reference(reference_tokens(df['reference']))
+    df['payment_key'] = range(len(df))
+    return df[~invalid].astype({'cents': 'int64'}), df.loc[invalid, 'id'].tolist()
+
+
+def parse_dates(values):
+    # ISO 8601 dates; those with an offset ('Z', '+05:30') are converted to local time, as transaction dates are stored
+    aware = values.astype(str).str.contains(r'\d:\d{2}(?::\d{2}(?:\.\d+)?)?\s*(?:Z|[+-]\d{2}(?::?\d{2})?)$', regex=True) & values.notna()
+    dates = pd.to_datetime(values.where(~aware), format='ISO8601', errors='coerce')
+    if aware.any():
+        local = pd.to_datetime(values[aware], format='ISO8601', errors='coerce', utc=True) \
+            .dt.tz_convert(tz.tzlocal()).dt.tz_localize(None)
+        dates = dates.where(~aware, local)
+    return dates
+
+
+def normalize_reference(series):
+    text = series.astype(object).where(series.notna(), '').astype(str).str.strip().str.upper()
+    return text.where(text.str.len() >= 3, None)
+
+
+def load_credits(start, end):
+    # Unreconciled credits of every bank dated between start and end, served by the (status, transaction_date, id) indexes
+    frames = []
+    for bank, bank_format in BANK_FORMATS.items():
+        table = bank_format['model'].__table__
+        amount = table.c[bank_format['credit_column']]
+        query = select(
+            table.c.id, table.c.transaction_date, amount.label('amount'),
+            table.c.Ref_or_Cheque_number.label('reference'), table.c.reference_token,
+        ).where(
+            table.c.status.is_(False), amount > 0, table.c.transaction_date.between(start, end),
+            *[func.upper(table.c[field]) == value.upper() for field, value in bank_format['credit_filter'].items()],
+        )
+        frame = pd.read_sql(query, db.session.connection())
+        if not frame.empty:
+            frame['bank'] = bank
+            frames.append(frame)
+
+    if frames:
+        credits = pd.concat(frames, ignore_index=True)
+    else:
+        credits = pd.DataFrame({column: pd.Series(dtype=dtype) for column, dtype in CREDIT_DTYPES.items()})
+    credits['transaction_date'] = pd.to_datetime(credits['transaction_date'])
+    credits['cents'] = (pd.to_numeric(credits['amount']) * 100).round().astype('int64')
+    credits['reference'] = normalize_reference(credits['reference'])
+    credits['reference_token'] = normalize_reference(credits['reference_token'])
+    credits['credit_key'] = range(len(credits))
+    return credits
+
+
+def one_to_one(matches):
+    # Closest pairs first; every payment and every credit is used at most once
+    matches = matches.assign(distance=(matches['transaction_date'] - matches['date']).abs()) \
+        .sort_values(['distance', 'payment_key', 'credit_key'])
+    return matches.drop_duplicates('credit_key').drop_duplicates('payment_key')
+
+
+def match_by_reference(payments, credits, window):
+    # Hash join of the payment reference on the credit's reference number and UTR token, same amount, within the window
+    keys = pd.concat([
+        credits[['credit_key', 'reference']],
+        credits[['credit_key', 'reference_token']].rename(columns={'reference_token': 'reference'}),
+    ]).dropna().drop_duplicates()
+    references = pd.concat([
+        payments[['payment_key', 'reference']],
+        payments[['payment_key', 'reference_token']].rename(columns={'reference_token': 'reference'}),
+    ]).dropna().drop_duplicates()
+    matches = references.merge(keys, on='reference').drop_duplicates(['payment_key', 'credit_key']) \
+        .merge(payments[['payment_key', 'cents', 'date']], on='payment_key') \
+        .merge(credits[['credit_key', 'cents', 'transaction_date']], on=['credit_key', 'cents'])
+    matches = matches[(matches['transaction_date'] - matches['date']).abs() <= window]
+    return one_to_one(matches)
+
+
+def match_by_rank(payments, credits, window):
+    # The n-th payment of an amount by date against the n-th credit of that amount, kept when within the window
+    payments = payments.assign(rank=payments.groupby('cents').cumcount())
+    credits = credits.assign(rank=credits.groupby('cents').cumcount())
+    matches = payments.merge(credits, on=['cents', 'rank'])
+    return matches[(matches['transaction_date'] - matches['date']).abs() <= window].drop(columns='rank')
+
+
+def match_by_amount(payments, credits, window):
+    """
+    Payments and credits of the same amount within the window. Runs of equal amounts are paired in date order
+    in one pass; the rest go through sorted-window joins (merge_asof by amount on the nearest date), one per
+    round, until a round matches nothing. Each round pairs every credit with at most its closest payment.
+    """
+    payments = payments.sort_values('date')[['payment_key', 'cents', 'date']]
+    credits = credits.sort_values('transaction_date')[['credit_key', 'cents', 'transaction_date']]
+    found = [match_by_rank(payments, credits, window)]
+    while True:
+        payments = payments[~payments['payment_key'].isin(found[-1]['payment_key'])]
+        credits = credits[~credits['credit_key'].isin(found[-1]['credit_key'])]
+        if payments.empty or credits.empty:
+            break
+        matches = pd.merge_asof(payments, credits, left_on='date', right_on='transaction_date', by='cents',
+                                tolerance=window, direction='nearest').dropna(subset=['credit_key'])
+        if matches.empty:
+            break
+        found.append(one_to_one(matches.astype({'credit_key': 'int64'})))
+    return pd.concat(found)[['payment_key', 'credit_key']]
+
+
+def mark_reconciled(bank, ids):
+    # One UPDATE per table; rows reconciled meanwhile by another request are left out by the status guard
+    table = BANK_FORMATS[bank]['model'].__table__
+    if db.session.get_bind().dialect.name == 'postgresql':
+        condition = table.c.id == any_(db.bindparam('ids', ids, type_=postgresql.ARRAY(db.Integer)))
+    else:
+        condition = table.c.id.in_(ids)
+    result = db.session.execute(table.update().where(condition, table.c.status.is_(False)).values(status=True))
+    return result.rowcount
+
+
+def reconcile(payments, window_days, dry_run=False):
+    window = pd.Timedelta(days=window_days)
+    credits = load_credits(payments['date'].min() - window, payments['date'].max() + window)
+
+    by_reference = match_by_reference(payments, credits, window).assign(match='reference')
+    remaining_payments = payments[~payments['payment_key'].isin(by_reference['payment_key'])]
+    remaining_credits = credits[~credits['credit_key'].isin(by_reference['credit_key'])]
+    by_amount = match_by_amount(remaining_payments, remaining_credits, window).assign(match='amount_date')
+
+    matches = pd.concat([by_reference[['payment_key', 'credit_key', 'match']], by_amount[['payment_key', 'credit_key', 'match']]]) \
+        .merge(payments[['payment_key', 'id']], on='payment_key') \
+        .merge(credits[['credit_key', 'bank', 'id']].rename(columns={'id': 'transaction_id'}), on='credit_key')
+
+    updated = {}
+    if not dry_run:
+        for bank, group in matches.groupby('bank'):
+            updated[bank] = mark_reconciled(bank, group['transaction_id'].astype(int).tolist())
+        db.session.commit()
+
+    unmatched = payments.loc[~payments['payment_key'].isin(matches['payment_key']), 'id'].tolist()
+    return matches, unmatched, updated
+
+
+@reconcile_bp.route('/statement/reconcile', methods=['POST'])
+def reconcile_statements():
+    """
+    Reconcile expected payments against the unreconciled credits of all banks.
+    ---
+    tags:
+      - Bank Statements
+    parameters:
+      - in: header
+        name: User-id
+        type: string
+        required: true
+        description: User ID
+      - in: body
+        name: body
+        required: true
+        schema:
+          type: object
+          properties:
+            payments:
+              type: array
+              items:
+                type: object
+                properties:
+                  id:
+                    type: string
+                  amount:
+                    type: number
+                  date:
+                    type: string
+                  reference:
+                    type: string
+            window_days:
+              type: integer
+            dry_run:
+              type: boolean
+
+    responses:
+      200:
+        description: Matched payments (status set on their transactions) and unmatched payment ids
+      400:
+        description: Bad Request - Missing or invalid payments
+      500:
+        description: Internal Server Error - Error updating details
+    """
+    user_id = request.headers.get('User-id')
+    if not user_id:
+        return jsonify({'error': 'Admin ID Missing'}), 400
+
+    body = request.get_json(silent=True) or {}
+    payments = body.get('payments')
+    if not isinstance(payments, list) or not payments or not all(isinstance(payment, dict) for payment in payments):
+        return jsonify({'error': 'No payments to reconcile'}), 400
+    if len(payments) > RECONCILE_MAX_PAYMENTS:
+        return jsonify({'error': f'At most {RECONCILE_MAX_PAYMENTS} payments per request'}), 400
+
+    window_days = body.get('window_days', RECONCILE_WINDOW_DAYS)
+    if not isinstance(window_days, int) or window_days < 0:
+        return jsonify({'error': 'Invalid window_days'}), 400
+
+    payments, invalid = parse_payments(payments)
+    if invalid:
+        return jsonify({'error': 'Payments need a numeric amount and a date', 'invalid_payments': invalid}), 400
+
+    try:
+        matches, unmatched, updated = reconcile(payments, window_days, dry_run=bool(body.get('dry_run')))
+    except Exception as e:
+        db.session.rollback()
+        error_message = f"Error reconciling payments {str(e)}"
+        log_data(message=error_message, event_type="/statement/reconcile", log_level=logging.ERROR)
+        return jsonify({'error': error_message}), 500
+
+    log_data(message=f"Reconciled {len(matches)} of {len(payments)} payments", event_type="/statement/reconcile",
+             log_level=logging.INFO, additional_context={'user_id': user_id, 'updated': updated})
+    return jsonify({
+        'matched': len(matches),
+        'unmatched': unmatched,
+        'updated': updated,
+        'matches': matches[['id', 'bank', 'transaction_id', 'match']].rename(columns={'id': 'payment_id'})
+                   .astype({'transaction_id': int}).to_dict('records'),
+    }), 200
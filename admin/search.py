@@ -0,0 +1,163 @@
+import pandas as pd
+from flask import Blueprint, jsonify, request
+from sqlalchemy import event, or_, select, text
+
+from admin.banks import BANK_FORMATS
+from admin.database import db
+from config import BULK_INSERT_BATCH_SIZE, SEARCH_RESULT_LIMIT
+
+# Create a Blueprint instance
+search_bp = Blueprint('search', __name__)
+
+# UTR / IMPS reference inside a narration: RTGS (22) or NEFT (16) UTR starting with the 4 letter bank code,
+# or a 12 digit IMPS/UPI RRN, optionally written right after a 'UTR'/'RRN' label
+REFERENCE_PATTERN = r'(?<![0-9A-Z])(?:UTR|RRN)?([A-Z]{4}[0-9A-Z]{12}(?:[0-9A-Z]{6})?|[0-9]{12})(?![0-9A-Z])'
+
+
+def reference_tokens(narrations):
+    # First UTR/RRN found in each narration, None when there is none
+    tokens = narrations.astype(object).where(narrations.notna(), '').astype(str).str.upper() \
+        .str.extract(REFERENCE_PATTERN, expand=False)
+    return tokens.astype(object).where(tokens.notna(), None)
+
+
+def backfill_reference_tokens(bank, batch_size=None):
+    # Fill reference_token of rows stored before it was extracted at ingest
+    bank_format = BANK_FORMATS[bank]
+    table = bank_format['model'].__table__
+    narration = table.c[bank_format['narration_column']]
+    batch_size = batch_size or BULK_INSERT_BATCH_SIZE
+
+    rows = pd.read_sql(select(table.c.id, narration).where(table.c.reference_token.is_(None)).order_by(table.c.id),
+                       db.session.connection())
+    rows['reference_token'] = reference_tokens(rows[narration.name])
+    rows = rows[rows['reference_token'].notna()]
+    for start in range(0, len(rows), batch_size):
+        batch = rows.iloc[start:start + batch_size]
+        db.session.execute(
+            table.update().where(table.c.id == db.bindparam('row_id')).values(reference_token=db.bindparam('token')),
+            [{'row_id': row_id, 'token': token} for row_id, token in zip(batch['id'].tolist(), batch['reference_token'])]
+        )
+    db.session.commit()
+    return len(rows)
+
+
+# < ------------------------------text search indexes ------------------------------------------>
+
+def _create_pg_trgm(target, connection, **kw):
+    # The gin_trgm_ops indexes of the statement models need the extension
+    if connection.dialect.name == 'postgresql':
+        connection.execute(text('CREATE EXTENSION IF NOT EXISTS pg_trgm'))
+
+
+def _search_columns(bank_format):
+    return ['Ref_or_Cheque_number', bank_format['narration_column'], 'reference_token']
+
+
+def _create_sqlite_search_tables(target, connection, **kw):
+    # On SQLite (local runs) every statement table gets an FTS5 trigram index kept in sync by triggers;
+    # PostgreSQL uses the pg_trgm GIN indexes of the models instead
+    if connection.dialect.name != 'sqlite':
+        return
+    for bank_format in BANK_FORMATS.values():
+        table = bank_format['model'].__tablename__
+        columns = ', '.join(f'"{column}"' for column in _search_columns(bank_format))
+        new = ', '.join(f'new."{column}"' for column in _search_columns(bank_format))
+        old = ', '.join(f'old."{column}"' for column in _search_columns(bank_format))
+        for statement in (
+            f"CREATE VIRTUAL TABLE IF NOT EXISTS {table}_search USING fts5({columns}, "
+            f"content='{table}', content_rowid='id', tokenize='trigram')",
+            f"CREATE TRIGGER IF NOT EXISTS {table}_search_insert AFTER INSERT ON {table} BEGIN "
+            f"INSERT INTO {table}_search(rowid, {columns}) VALUES (new.id, {new}); END",
+            f"CREATE TRIGGER IF NOT EXISTS {table}_search_delete AFTER DELETE ON {table} BEGIN "
+            f"INSERT INTO {table}_search({table}_search, rowid, {columns}) VALUES ('delete', old.id, {old}); END",
+            f"CREATE TRIGGER IF NOT EXISTS {table}_search_update AFTER UPDATE ON {table} BEGIN "
+            f"INSERT INTO {table}_search({table}_search, rowid, {columns}) VALUES ('delete', old.id, {old}); "
+            f"INSERT INTO {table}_search(rowid, {columns}) VALUES (new.id, {new}); END",
+        ):
+            connection.execute(text(statement))
+
+
+event.listen(db.metadata, 'before_create', _create_pg_trgm)
+event.listen(db.metadata, 'after_create', _create_sqlite_search_tables)
+
+
+# < ------------------------------reference lookup ------------------------------------------>
+
+def _match_condition(bank_format, table, query, dialect):
+    if dialect == 'sqlite':
+        # Trigram FTS5 MATCH of the quoted query finds it anywhere in the indexed columns
+        phrase = '"' + query.replace('"', '""') + '"'
+        matches = text(f"SELECT rowid FROM {table.name}_search WHERE {table.name}_search MATCH :phrase") \
+            .bindparams(phrase=phrase).columns(rowid=db.Integer)
+        return table.c.id.in_(matches)
+
+    # ILIKE '%...%' is served by the pg_trgm GIN indexes; a query written as 'UTR...' also matches the bare token
+    token = reference_tokens(pd.Series([query])).iloc[0] or query.upper()
+    pattern = '%' + query.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_') + '%'
+    return or_(
+        table.c.reference_token == token,
+        table.c.Ref_or_Cheque_number.ilike(pattern, escape='\\'),
+        table.c[bank_format['narration_column']].ilike(pattern, escape='\\'),
+    )
+
+
+def search_references(query, limit):
+    # Transactions of every bank whose reference, UTR token or narration contains query, newest first
+    dialect = db.session.get_bind().dialect.name
+    results = []
+    for bank, bank_format in BANK_FORMATS.items():
+        table = bank_format['model'].__table__
+        columns = [table.c.id, table.c.transaction_date, table.c.Ref_or_Cheque_number, table.c.reference_token,
+                   table.c[bank_format['narration_column']], *[table.c[column] for column in bank_format['amount_columns']]]
+        rows = db.session.execute(
+            select(*columns).where(_match_condition(bank_format, table, query, dialect))
+            .order_by(table.c.transaction_date.desc(), table.c.id.desc()).limit(limit)
+        ).mappings().all()
+        results += [{
+            'bank': bank,
+            'id': row['id'],
+            'transaction_date': row['transaction_date'].isoformat() if row['transaction_date'] else None,
+            'reference': row['Ref_or_Cheque_number'],
+            'reference_token': row['reference_token'],
+            'narration': row[bank_format['narration_column']],
+            'amounts': {column: row[column] for column in bank_format['amount_columns']},
+        } for row in rows]
+
+    results.sort(key=lambda result: (result['transaction_date'] or '', result['id']), reverse=True)
+    return results[:limit]
+
+
+@search_bp.route('/statement/search', methods=['GET'])
+def search_statements():
+    """
+    Cross-bank reference / UTR lookup.
+    ---
+    tags:
+      - Bank Statements
+    parameters:
+      - name: q
+        in: query
+        type: string
+        required: true
+        description: Reference, cheque number, UTR/RRN or narration text (at least 3 characters)
+      - name: limit
+        in: query
+        type: integer
+        description: Most results returned
+
+    responses:
+      200:
+        description: Matching transactions of all banks, newest first
+      400:
+        description: Bad Request - Missing or too short query
+    """
+    query = (request.args.get('q') or '').strip()
+    if len(query) < 3:
+        return jsonify({'error': 'Query must be at least 3 characters'}), 400
+
+    limit = request.args.get('limit', '')
+    limit = min(int(limit), SEARCH_RESULT_LIMIT) if limit.isdigit() and int(limit) > 0 else SEARCH_RESULT_LIMIT
+
+    results = search_references(query, limit)
+    return jsonify({'query': query, 'count': len(results), 'results': results}), 200
@@ -0,0 +1,290 @@
+import base64
+import json
+import logging
+from datetime import datetime, timedelta
+from decimal import Decimal, InvalidOperation
+
+from flask import Blueprint, jsonify, request
+from sqlalchemy import and_, or_, select, tuple_
+
+from admin.admission import upload_admission
+from admin.banks import BANK_FORMATS
+from admin.database import db
+from admin.ingest import process_statement_file
+from admin.jobs import async_requested, enqueue_upload
+from admin.metrics import inc
+from config import STATEMENT_MAX_PAGE_SIZE, STATEMENT_PAGE_SIZE, UPLOAD_RETRY_AFTER
+from logs.log import log_data
+
+# Create a Blueprint instance
+statements_bp = Blueprint('statements', __name__)
+
+
+# Bank statement upload, one route for every bank in BANK_FORMATS
+@statements_bp.route('/statement/<bank>', methods=['POST'])
+def upload_statement(bank):
+    """
+    Bank Settlement upload.
+    ---
+    tags:
+      - Bank Statements
+    parameters:
+      - name: bank
+        in: path
+        type: string
+        required: true
+        description: Bank of the statement (hdfc, icici, sbi)
+      - in: header
+        name: User-id
+        type: string
+        required: true
+        description: User ID
+      - name: file
+        in: formData
+        type: file
+        description: statement file
+      - name: async
+        in: query
+        type: boolean
+        description: Process the file in the background and return a job id
+      - name: full
+        in: query
+        type: boolean
+        description: Process every row of the file, ignoring the bank's ingest watermark and an earlier upload of the same file
+
+    responses:
+      202:
+        description: Upload accepted, poll /statement/jobs/{job_id} for the result
+      201:
+        description: Settlement updated successfully
+      400:
+        description: Bad Request - Missing or invalid parameters
+      404:
+        description: Unsupported bank
+      413:
+        description: File larger than MAX_CONTENT_LENGTH
+      500:
+        description: Internal Server Error - Error updating details
+      503:
+        description: Too many statements in process, retry after the Retry-After seconds
+    """
+    if bank not in BANK_FORMATS:
+        return jsonify({'error': f'Unsupported bank {bank}'}), 404
+
+    user_id = request.headers.get('User-id')
+    if not user_id:
+        return jsonify({'error': 'Admin ID Missing'}), 400
+
+    # Rows before the bank's ingest watermark are skipped unless the whole file is asked for
+    use_watermark = request.args.get('full', '').lower() not in ('1', 'true', 'yes')
+
+    # Opt-in async mode: the file is saved and processed by the upload worker pool, which waits for its own slot
+    if async_requested():
+        return receive_upload(bank, user_id, use_watermark, background=True)
+
+    # The request body is what this upload adds to the process memory
+    with upload_admission(request.content_length or 0) as admitted:
+        if not admitted:
+            inc('statement_uploads_rejected_total', bank=bank)
+            log_data(message='Upload rejected, too many statements in process', event_type=f"/statement/{bank}",
+                     log_level=logging.WARNING)
+            return jsonify({'error': 'Too many statements in process, retry later'}), 503, \
+                {'Retry-After': str(UPLOAD_RETRY_AFTER)}
+        return receive_upload(bank, user_id, use_watermark, background=False)
+
+
+def receive_upload(bank, user_id, use_watermark, background):
+    if 'file' not in request.files:
+        return jsonify({'error': 'No file part in the request'}), 400
+
+    file = request.files['file']
+    if file.filename == '':
+        return jsonify({'error': 'No file selected for uploading'}), 400
+
+    if not file.filename.endswith(('.xls', '.xlsx')):
+        return jsonify({'error': 'Allowed file types are .xls and .xlsx'}), 400
+
+    if background:
+        job_id = enqueue_upload(bank, file, user_id, use_watermark)
+        return jsonify({'job_id': job_id, 'state': 'queued'}), 202
+
+    result, status_code = process_statement_file(bank, file, user_id, use_watermark)
+    return jsonify(result), status_code
+
+
+# Transactions of a bank, filtered and keyset paginated
+@statements_bp.route('/statement/<bank>', methods=['GET'])
+def list_statements(bank):
+    """
+    Bank statement transactions.
+    ---
+    tags:
+      - Bank Statements
+    parameters:
+      - name: bank
+        in: path
+        type: string
+        required: true
+        description: Bank of the statement (hdfc, icici, sbi)
+      - name: from_date
+        in: query
+        type: string
+        description: Transactions on or after this date (YYYY-MM-DD or ISO datetime)
+      - name: to_date
+        in: query
+        type: string
+        description: Transactions on or before this date (YYYY-MM-DD or ISO datetime)
+      - name: min_amount
+        in: query
+        type: number
+        description: Smallest withdrawal/deposit (or transaction) amount
+      - name: max_amount
+        in: query
+        type: number
+        description: Largest withdrawal/deposit (or transaction) amount
+      - name: status
+        in: query
+        type: boolean
+        description: Reconciliation status
+      - name: upload_admin_id
+        in: query
+        type: string
+        description: Admin who uploaded the transactions
+      - name: reference
+        in: query
+        type: string
+        description: Exact reference / cheque number
+      - name: limit
+        in: query
+        type: integer
+        description: Page size
+      - name: cursor
+        in: query
+        type: string
+        description: next_cursor of the previous page
+
+    responses:
+      200:
+        description: One page of transactions ordered by transaction date and id, with the cursor of the next page
+      400:
+        description: Bad Request - Invalid filter, limit or cursor
+      404:
+        description: Unsupported bank
+    """
+    if bank not in BANK_FORMATS:
+        return jsonify({'error': f'Unsupported bank {bank}'}), 404
+
+    bank_format = BANK_FORMATS[bank]
+    table = bank_format['model'].__table__
+    try:
+        filters, dated_only = statement_filters(bank_format, table, request.args)
+        limit = page_size(request.args.get('limit'))
+        cursor = decode_cursor(request.args.get('cursor'))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+    rows, next_cursor = statement_page(table, filters, dated_only, cursor, limit)
+    return jsonify({'bank': bank, 'count': len(rows), 'next_cursor': next_cursor, 'transactions': rows}), 200
+
+
+def parse_datetime(value, name):
+    try:
+        return datetime.fromisoformat(value)
+    except ValueError:
+        raise ValueError(f"Invalid {name}: {value}")
+
+
+def date_filters(table, args, from_name, to_name):
+    # Transaction date range of the query string parameters from_name / to_name
+    filters = []
+    if args.get(from_name):
+        filters.append(table.c.transaction_date >= parse_datetime(args[from_name], from_name))
+    if args.get(to_name):
+        to_date = parse_datetime(args[to_name], to_name)
+        if len(args[to_name]) == 10:
+            # A plain date covers the whole day
+            filters.append(table.c.transaction_date < to_date + timedelta(days=1))
+        else:
+            filters.append(table.c.transaction_date <= to_date)
+    return filters
+
+
+def statement_filters(bank_format, table, args):
+    # Query string -> WHERE clauses; dated_only is set when a date filter excludes undated rows anyway
+    filters = date_filters(table, args, 'from_date', 'to_date')
+
+    amount_range = []
+    for name in ('min_amount', 'max_amount'):
+        if args.get(name):
+            try:
+                amount_range.append((name, Decimal(args[name])))
+            except InvalidOperation:
+                raise ValueError(f"Invalid {name}: {args[name]}")
+    if amount_range:
+        filters.append(or_(*[
+            and_(*[table.c[column] >= amount if name == 'min_amount' else table.c[column] <= amount
+                   for name, amount in amount_range])
+            for column in bank_format['amount_columns']
+        ]))
+
+    if args.get('status'):
+        if args['status'].lower() not in ('true', 'false'):
+            raise ValueError(f"Invalid status: {args['status']}")
+        filters.append(table.c.status.is_(args['status'].lower() == 'true'))
+    if args.get('upload_admin_id'):
+        filters.append(table.c.upload_admin_id == args['upload_admin_id'])
+    if args.get('reference'):
+        filters.append(table.c.Ref_or_Cheque_number == args['reference'])
+
+    return filters, bool(args.get('from_date') or args.get('to_date'))
+
+
+def page_size(value):
+    if value is None:
+        return STATEMENT_PAGE_SIZE
+    if not value.isdigit() or int(value) < 1:
+        raise ValueError(f"Invalid limit: {value}")
+    return min(int(value), STATEMENT_MAX_PAGE_SIZE)
+
+
+def encode_cursor(row):
+    transaction_date = row['transaction_date'].isoformat() if row['transaction_date'] else None
+    return base64.urlsafe_b64encode(json.dumps([transaction_date, row['id']]).encode()).decode()
+
+
+def decode_cursor(value):
+    # (transaction_date or None, id) of the last row of the previous page
+    if not value:
+        return None
+    try:
+        transaction_date, row_id = json.loads(base64.urlsafe_b64decode(value.encode()))
+        return (datetime.fromisoformat(transaction_date) if transaction_date else None), int(row_id)
+    except (ValueError, TypeError):
+        raise ValueError("Invalid cursor")
+
+
+def statement_page(table, filters, dated_only, cursor, limit):
+    """
+    Keyset pagination on (transaction_date, id): each page seeks past the last row of the previous
+    one through the (transaction_date, id) indexes, so any page costs the same. Rows without a date
+    come after all dated rows, ordered by id.
+    """
+    columns = [column for column in table.c if column.name != 'fingerprint']
+    rows = []
+    if cursor is None or cursor[0] is not None:
+        seek = [*filters, table.c.transaction_date.isnot(None)]
+        if cursor:
+            seek.append(tuple_(table.c.transaction_date, table.c.id) > tuple_(*cursor))
+        query = select(*columns).where(*seek).order_by(table.c.transaction_date, table.c.id).limit(limit + 1)
+        rows = db.session.execute(query).mappings().all()
+
+    if len(rows) <= limit and not dated_only:
+        seek = [*filters, table.c.transaction_date.is_(None)]
+        if cursor and cursor[0] is None:
+            seek.append(table.c.id > cursor[1])
+        query = select(*columns).where(*seek).order_by(table.c.id).limit(limit + 1 - len(rows))
+        rows += db.session.execute(query).mappings().all()
+
+    next_cursor = encode_cursor(rows[limit - 1]) if len(rows) > limit else None
+    return [{name: value.isoformat() if isinstance(value, datetime) else value for name, value in row.items()}
+            for row in rows[:limit]], next_cursor
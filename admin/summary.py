@@ -0,0 +1,151 @@
+from datetime import date, timedelta
+
+from flask import Blueprint, jsonify, request
+from sqlalchemy import and_, case, func, literal, or_, select
+from sqlalchemy.dialects import postgresql, sqlite
+
+from admin.banks import BANK_FORMATS
+from admin.database import DailyAccountSummary, db
+
+# Create a Blueprint instance
+summary_bp = Blueprint('summary', __name__)
+
+# Additive columns of daily_account_summary, in the column order of day_totals()
+TOTAL_COLUMNS = ('deposit_total', 'deposit_count', 'withdrawal_total', 'withdrawal_count', 'transaction_count')
+SUMMARY_COLUMNS = ('bank', 'day', *TOTAL_COLUMNS, 'closing_balance', 'closing_time')
+
+
+def day_totals(bank, filters, newest_first=False):
+    """
+    SELECT of one daily_account_summary row per day of the bank's dated rows matching filters. The
+    closing balance is the one of the day's latest transaction; rows of the same time are taken in
+    the order they were stored, reversed for a statement that lists its newest transaction first.
+    """
+    bank_format = BANK_FORMATS[bank]
+    table = bank_format['model'].__table__
+    amount = table.c[bank_format['credit_column']]
+    is_credit = and_(*[func.upper(table.c[field]) == value.upper() for field, value in bank_format['credit_filter'].items()])
+    deposit = case((is_credit, amount)) if bank_format['credit_filter'] else amount
+    withdrawal = table.c[bank_format['debit_column']] if bank_format['debit_column'] else case((is_credit, None), else_=amount)
+
+    day = func.date(table.c.transaction_date)
+    stored_order = table.c.id.asc() if newest_first else table.c.id.desc()
+    rows = select(
+        day.label('day'), deposit.label('deposit'), withdrawal.label('withdrawal'),
+        table.c[bank_format['balance_column']].label('balance'), table.c.transaction_date,
+        func.row_number().over(partition_by=day, order_by=(table.c.transaction_date.desc(), stored_order)).label('position'),
+    ).where(table.c.transaction_date.isnot(None), *filters).subquery()
+
+    return select(
+        literal(bank).label('bank'), rows.c.day,
+        func.coalesce(func.sum(rows.c.deposit), 0), func.count(rows.c.deposit),
+        func.coalesce(func.sum(rows.c.withdrawal), 0), func.count(rows.c.withdrawal), func.count(),
+        func.max(case((rows.c.position == 1, rows.c.balance))), func.max(rows.c.transaction_date),
+    ).where(rows.c.day.isnot(None)).group_by(rows.c.day)
+
+
+def add_batch_to_summary(bank, batch_id, newest_first=False):
+    """
+    Upserts the totals of the rows stored by a batch into the days they fall on, in the caller's
+    transaction. Totals are added; the closing balance is replaced when the batch's last
+    transaction of the day is at least as late as the stored one.
+    """
+    table = DailyAccountSummary.__table__
+    dialect = db.session.get_bind().dialect.name
+    insert = (postgresql.insert if dialect == 'postgresql' else sqlite.insert)(table)
+    batch_table = BANK_FORMATS[bank]['model'].__table__
+    statement = insert.from_select(SUMMARY_COLUMNS, day_totals(bank, [batch_table.c.batch_id == batch_id], newest_first))
+
+    excluded = statement.excluded
+    later = or_(table.c.closing_time.is_(None), excluded.closing_time >= table.c.closing_time)
+    db.session.execute(statement.on_conflict_do_update(index_elements=['bank', 'day'], set_={
+        **{name: table.c[name] + excluded[name] for name in TOTAL_COLUMNS},
+        'closing_balance': case((later, excluded.closing_balance), else_=table.c.closing_balance),
+        'closing_time': case((later, excluded.closing_time), else_=table.c.closing_time),
+    }))
+
+
+def rebuild_daily_summary(bank, first_day=None, last_day=None):
+    """
+    Recomputes the summary rows of a bank from its statement table, for every day or for the days
+    from first_day to last_day. The caller commits. Returns the number of days written.
+    """
+    table = BANK_FORMATS[bank]['model'].__table__
+    summary = DailyAccountSummary.__table__
+    filters, stale = [], [summary.c.bank == bank]
+    if first_day:
+        filters.append(table.c.transaction_date >= first_day)
+        stale.append(summary.c.day >= first_day)
+    if last_day:
+        filters.append(table.c.transaction_date < last_day + timedelta(days=1))
+        stale.append(summary.c.day <= last_day)
+
+    db.session.execute(summary.delete().where(*stale))
+    return db.session.execute(summary.insert().from_select(SUMMARY_COLUMNS, day_totals(bank, filters))).rowcount
+
+
+def parse_day(value, name):
+    try:
+        return date.fromisoformat(value)
+    except ValueError:
+        raise ValueError(f"Invalid {name}: {value}")
+
+
+def summary_json(row):
+    return {
+        'day': row.day.isoformat(),
+        'deposit_total': row.deposit_total,
+        'deposit_count': row.deposit_count,
+        'withdrawal_total': row.withdrawal_total,
+        'withdrawal_count': row.withdrawal_count,
+        'transaction_count': row.transaction_count,
+        'closing_balance': row.closing_balance,
+    }
+
+
+# Daily totals and end-of-day balances of a bank
+@summary_bp.route('/statement/<bank>/summary', methods=['GET'])
+def daily_summary(bank):
+    """
+    Daily account summary.
+    ---
+    tags:
+      - Bank Statements
+    parameters:
+      - name: bank
+        in: path
+        type: string
+        required: true
+        description: Bank of the statement (hdfc, icici, sbi)
+      - name: from
+        in: query
+        type: string
+        description: First day (YYYY-MM-DD)
+      - name: to
+        in: query
+        type: string
+        description: Last day (YYYY-MM-DD)
+
+    responses:
+      200:
+        description: Deposit and withdrawal totals, transaction counts and closing balance of each day with transactions
+      400:
+        description: Bad Request - Invalid date
+      404:
+        description: Unsupported bank
+    """
+    if bank not in BANK_FORMATS:
+        return jsonify({'error': f'Unsupported bank {bank}'}), 404
+
+    # A primary key range of daily_account_summary, whatever the size of the statement table
+    query = select(DailyAccountSummary).where(DailyAccountSummary.bank == bank).order_by(DailyAccountSummary.day)
+    try:
+        if request.args.get('from'):
+            query = query.where(DailyAccountSummary.day >= parse_day(request.args['from'], 'from'))
+        if request.args.get('to'):
+            query = query.where(DailyAccountSummary.day <= parse_day(request.args['to'], 'to'))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+    days = [summary_json(row) for row in db.session.execute(query).scalars()]
+    return jsonify({'bank': bank, 'count': len(days), 'days': days}), 200
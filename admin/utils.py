@@ -1,70 +1,119 @@
-from flask import jsonify, request
+from flask import Request, jsonify, request
+import hashlib
+import os
+import tempfile
 import pandas as pd
-import requests
+from pandas.io.parsers import TextParser
 from datetime import datetime
+from itertools import chain, islice
 
 from functools import wraps
 
-from config import HDFC_REQUIRED_COLUMNS, ICICI_REQUIRED_COLUMNS, SBI_REQUIRED_COLUMNS
-from config import REQUIRED_BANK_DATA_HDFC, REQUIRED_BANK_DATA_ICICI, REQUIRED_BANK_DATA_SBI
+from admin.auth import verify_token
+from admin.readers import iter_sheet_rows, read_statement
 
-def current_time():
-    return datetime.now().strftime('%Y-%m-%d %I:%M %p')
+from config import STREAM_CHUNK_ROWS, STREAM_UPLOAD_BYTES, UPLOAD_SPOOL_BYTES, UPLOAD_SPOOL_DIR
 
-# < ------------------------------bank's columns check ------------------------------------------>
+def current_datetime():
+    # For DateTime columns; SQLite's DateTime type only accepts datetime objects
+    return datetime.now()
 
-def validate_column_hdfc(df):
-    required_columns = HDFC_REQUIRED_COLUMNS
-    if not required_columns.issubset(df.columns):
-        missing_columns = required_columns - set(df.columns)
-        return False, f"Missing required columns for Bank HDFC: {', '.join(missing_columns)}"
-    return True, "Validation successful for Bank HDFC"
+def file_digest(file, chunk_size=1024 * 1024):
+    # sha256 of the raw upload, read in chunks; the stream is rewound for the Excel reader
+    digest = hashlib.sha256()
+    for chunk in iter(lambda: file.stream.read(chunk_size), b''):
+        digest.update(chunk)
+    file.stream.seek(0)
+    return digest.hexdigest()
 
 
-def validate_column_icici(df):
-    required_columns = ICICI_REQUIRED_COLUMNS
-    if not required_columns.issubset(df.columns):
-        missing_columns = required_columns - set(df.columns)
-        return False, f"Missing required columns for Bank ICICI: {', '.join(missing_columns)}"
-    return True, "Validation successful for Bank ICICI"
+# < ------------------------------statement workbook read ------------------------------------------>
 
+class StatementRequest(Request):
+    # Big uploaded files go to a named temp file, removed when the request ends, that the readers open by path
+    def _get_file_stream(self, total_content_length, content_type, filename=None, content_length=None):
+        if total_content_length is None or total_content_length >= UPLOAD_SPOOL_BYTES:
+            return tempfile.NamedTemporaryFile('wb+', dir=UPLOAD_SPOOL_DIR, suffix=os.path.splitext(filename or '')[1])
+        return super()._get_file_stream(total_content_length, content_type, filename, content_length)
 
-def validate_column_sbi(df):
-    required_columns = SBI_REQUIRED_COLUMNS
-    if not required_columns.issubset(df.columns):
-        missing_columns = required_columns - set(df.columns)
-        return False, f"Missing required columns for Bank SBI: {', '.join(missing_columns)}"
-    return True, "Validation successful for Bank SBI"
 
+def file_size(file):
+    file.stream.seek(0, os.SEEK_END)
+    size = file.stream.tell()
+    file.stream.seek(0)
+    return size
 
-# < ------------------------------bank's credentials check ------------------------------------------>
 
-def validate_account_hdfc(file, engine):
-    df = pd.read_excel(file, engine=engine, header=None)
-    required_details = REQUIRED_BANK_DATA_HDFC
-    details_df = df.head(19)
-    all_text = ' '.join(details_df.astype(str).stack().unique())
-    missing_details = [detail for detail in required_details if detail not in all_text]
-    if missing_details:
-        return False, f"Missing required bank detail(s): {', '.join(missing_details)}"
-    return True, "Bank details validation successful"
+def header_columns(values):
+    # Column names as pd.read_excel builds them: blank -> 'Unnamed: <n>', repeated names -> '<name>.1'
+    row = ['' if value is None or (isinstance(value, float) and pd.isna(value)) else value for value in values]
+    return TextParser([row], header=0).read().columns
 
 
-def validate_account_icici(file, engine):
-    df = pd.read_excel(file, engine=engine, header=None)
-    required_details = REQUIRED_BANK_DATA_ICICI
-    details_df = df.head(19)
-    all_text = ' '.join(details_df.astype(str).stack().unique())
-    missing_details = [detail for detail in required_details if detail not in all_text]
-    if missing_details:
-        return False, f"Missing required bank detail(s): {', '.join(missing_details)}"
-    return True, "Bank details validation successful"
+def statement_frame(grid, header_row):
+    # Data block below the header row with the raw cell values, indexed by sheet row number (1-based)
+    df = grid.iloc[header_row + 1:]
+    df.index = df.index + 1
+    df.columns = header_columns(grid.iloc[header_row].tolist())
+    return df
+
+
+def _stream_chunks(rows, columns, chunk_size, first_row):
+    # Chunks are indexed by sheet row number, like statement_frame
+    width = len(columns)
+    while True:
+        batch = [tuple(row[:width]) + (None,) * (width - len(row)) for row in islice(rows, chunk_size)]
+        if not batch:
+            return
+        yield pd.DataFrame(batch, columns=columns, index=range(first_row, first_row + len(batch)))
+        first_row += len(batch)
 
 
-def validate_account_sbi(file, engine):
-    df = pd.read_excel(file, engine=engine, header=None)
-    required_details = REQUIRED_BANK_DATA_SBI
-    details_df = df.head(19)
+def open_statement(file, reader, header_row, head_rows):
+    """
+    Returns (header block grid, data column names, iterator of raw data chunks).
+    Files under STREAM_UPLOAD_BYTES are parsed in one go and come back as a single chunk;
+    bigger files are streamed STREAM_CHUNK_ROWS rows at a time so memory stays bounded.
+    """
+    if file_size(file) < STREAM_UPLOAD_BYTES:
+        grid = read_statement(file, reader)
+        df = statement_frame(grid, header_row)
+        return grid.head(head_rows), df.columns, iter([df])
+
+    rows = iter_sheet_rows(file, reader)
+    block = list(islice(rows, max(header_row + 1, head_rows)))
+    if len(block) <= header_row:
+        raise ValueError("Statement has no header row")
+    columns = header_columns(block[header_row])
+    # The header block read ahead may already hold the first data rows
+    rows = chain(block[header_row + 1:], rows)
+    return pd.DataFrame(block[:head_rows]), columns, _stream_chunks(rows, columns, STREAM_CHUNK_ROWS, header_row + 2)
+
+
+def clean_text(series):
+    # Text column as stored: numeric codes read as floats (2300.0) are written as integers, blanks as NULL
+    def render(value):
+        if isinstance(value, float) and value.is_integer():
+            return str(int(value))
+        return str(value)
+    return series.map(render, na_action='ignore').astype(object).where(series.notna(), None)
+
+
+# < ------------------------------bank's columns check ------------------------------------------>
+
+def validate_columns(bank_format, columns):
+    required_columns = bank_format['required_columns']
+    if not required_columns.issubset(columns):
+        missing_columns = required_columns - set(columns)
+        return False, f"Missing required columns for Bank {bank_format['name']}: {', '.join(missing_columns)}"
+    return True, f"Validation successful for Bank {bank_format['name']}"
+
+
+# < ------------------------------bank's credentials check ------------------------------------------>
+
+def validate_account(bank_format, grid):
+    required_details = bank_format['identity']
+    details_df = grid.head(bank_format['head_rows'])
     all_text = ' '.join(details_df.astype(str).stack().unique())
     missing_details = [detail for detail in required_details if detail not in all_text]
     if missing_details:
@@ -79,18 +128,13 @@ def token_required(f):
         token = request.headers.get('Authorization')
         if not token:
             return jsonify({'message': 'Token is missing'}), 401
-        
-        headers = {'Authorization': token}
+
         try:
-            user_info_response = requests.post("http://127.0.0.1:5001/token_check", headers=headers)
-            
-            if user_info_response.status_code != 200:
+            user = verify_token(token)
+            if user is None:
                 return jsonify({'message': 'Token is invalid'}), 401
-            
-            user_info = user_info_response.json()
-            logged_user_id = user_info.get("_id")
-            logged_user_code = user_info.get("user_code")
-            logged_user_name = user_info.get("user_name")
+
+            logged_user_id, logged_user_code, logged_user_name = user
         except Exception as e:
             return jsonify({'message': 'Token is invalid', 'error': str(e)}), 401
  
@@ -0,0 +1,138 @@
+import pandas as pd
+
+from admin.database import IngestWatermark, db
+from admin.utils import current_datetime
+
+# Balances closer than this are the same balance
+BALANCE_TOLERANCE = 0.005
+
+
+def ingest_since(watermark):
+    # Rows dated before the watermark's day are already stored; the boundary day goes through the row dedup
+    return pd.Timestamp(watermark.transaction_date).normalize() if watermark else None
+
+
+def signed_amounts(bank_format, data):
+    # Credit minus debit of every row
+    credit = pd.to_numeric(data[bank_format['credit_column']]).fillna(0)
+    if bank_format['debit_column']:
+        return credit - pd.to_numeric(data[bank_format['debit_column']]).fillna(0)
+    is_credit = pd.Series(True, index=data.index)
+    for field, value in bank_format['credit_filter'].items():
+        is_credit &= data[field].astype(str).str.strip().str.upper() == value.upper()
+    return credit.where(is_credit, -credit)
+
+
+def new_balance_trail(watermark):
+    """
+    Balances seen while a statement is read, kept chunk by chunk:
+        first_date, last_date  first and last dated rows in file order (a newest-first file has first > last)
+        latest                 (date, balance of the first and of the last row in file order) of the newest date
+        earliest_new           the same for the oldest date after the watermark, with the signed amounts
+        boundary_balances      balances of the rows on the watermark's day up to the watermark
+        order_votes            [oldest first, newest first] counts of consecutive rows whose balances follow
+                               in that order, for files whose dates cannot tell (a single day)
+    """
+    return {
+        'watermark': (pd.Timestamp(watermark.transaction_date), _balance(watermark.closing_balance)) if watermark else None,
+        'first_date': None, 'last_date': None, 'latest': None, 'earliest_new': None, 'boundary_balances': set(),
+        'order_votes': [0, 0],
+    }
+
+
+def _balance(value):
+    return None if value is None or pd.isna(value) else round(float(value), 2)
+
+
+def _edge_rows(dates, balances, amounts, mask):
+    # (date, (balance, amount) of the first and of the last row in file order) of the rows in mask
+    rows = mask.nonzero()[0]
+    first, last = rows[0], rows[-1]
+    return dates.iloc[first], (balances.iloc[first], amounts.iloc[first]), (balances.iloc[last], amounts.iloc[last])
+
+
+def _merge_edge(current, found, newest):
+    # Keep the newest (or oldest) date; on the same date the first row comes from the earlier chunk
+    if current is None or (found[0] > current[0] if newest else found[0] < current[0]):
+        return found
+    if found[0] == current[0]:
+        return current[0], current[1], found[2]
+    return current
+
+
+def track_balances(bank_format, df, trail):
+    # Fold one normalized chunk (rows in file order) into the trail
+    dated = df[df['transaction_date'].notna()]
+    if dated.empty:
+        return
+    dates = dated['transaction_date']
+    balances = pd.to_numeric(dated[bank_format['balance_column']])
+    amounts = signed_amounts(bank_format, dated)
+
+    if trail['first_date'] is None:
+        trail['first_date'] = dates.iloc[0]
+    trail['last_date'] = dates.iloc[-1]
+    steps = balances.diff()
+    trail['order_votes'][0] += int(((steps - amounts).abs() <= BALANCE_TOLERANCE).sum())
+    trail['order_votes'][1] += int(((steps + amounts.shift()).abs() <= BALANCE_TOLERANCE).sum())
+    trail['latest'] = _merge_edge(trail['latest'], _edge_rows(dates, balances, amounts, (dates == dates.max()).to_numpy()), True)
+
+    if trail['watermark']:
+        stored_date = trail['watermark'][0]
+        boundary = ((dates <= stored_date) & (dates >= stored_date.normalize())).to_numpy()
+        trail['boundary_balances'].update(_balance(balance) for balance in balances[boundary] if not pd.isna(balance))
+        new = (dates > stored_date).to_numpy()
+        if new.any():
+            oldest = new & (dates == dates[new].min()).to_numpy()
+            trail['earliest_new'] = _merge_edge(trail['earliest_new'], _edge_rows(dates, balances, amounts, oldest), False)
+
+
+def newest_first(trail):
+    # Whether the statement lists its newest transaction first
+    if trail['first_date'] is None:
+        return False
+    if trail['first_date'] != trail['last_date']:
+        return trail['first_date'] > trail['last_date']
+    oldest_votes, newest_votes = trail['order_votes']
+    return newest_votes > oldest_votes
+
+
+def balance_gap(trail):
+    """
+    None when the statement continues from the stored closing balance, else what did not match: the
+    stored balance is missing from the boundary day, or the first new row does not follow from it.
+    """
+    if not trail['watermark'] or trail['earliest_new'] is None or trail['watermark'][1] is None:
+        return None
+    stored_date, stored_balance = trail['watermark']
+    if trail['boundary_balances']:
+        if stored_balance in trail['boundary_balances']:
+            return None
+        return {'stored_date': stored_date.isoformat(), 'stored_balance': stored_balance,
+                'reason': 'Stored closing balance not found on the boundary day'}
+
+    date, first, last = trail['earliest_new']
+    balance, amount = last if newest_first(trail) else first
+    if pd.isna(balance):
+        return None
+    expected = round(stored_balance + float(amount), 2)
+    if abs(float(balance) - expected) <= BALANCE_TOLERANCE:
+        return None
+    return {'stored_date': stored_date.isoformat(), 'stored_balance': stored_balance, 'first_new_date': date.isoformat(),
+            'expected_balance': expected, 'found_balance': _balance(balance), 'reason': 'Balance does not continue'}
+
+
+def advance_watermark(bank, trail):
+    # Moves the bank's watermark to the newest row of the statement, in the caller's transaction
+    if trail['latest'] is None:
+        return
+    date, first, last = trail['latest']
+    balance = _balance((first if newest_first(trail) else last)[0])
+    watermark = db.session.get(IngestWatermark, bank, with_for_update=True)
+    if watermark is None:
+        db.session.add(IngestWatermark(bank=bank, transaction_date=date.to_pydatetime(), closing_balance=balance,
+                                       updated_time=current_datetime()))
+    elif date >= pd.Timestamp(watermark.transaction_date):
+        watermark.transaction_date = date.to_pydatetime()
+        watermark.closing_balance = balance
+        watermark.updated_time = current_datetime()
@@ -0,0 +1,48 @@
+"""
+Stage by stage comparison of two benchmark result files written by benchmarks/run.py.
+
+    python -m benchmarks.compare benchmarks/results/before.json benchmarks/results/after.json
+
+Repeats of a case are averaged; a ratio under 1.0 means the second run was faster.
+"""
+import argparse
+import json
+from collections import defaultdict
+
+
+def load_runs(path):
+    # (bank, format, rows) -> {stage: mean seconds}, with 'total' for the whole case
+    with open(path) as results_file:
+        results = json.load(results_file)
+    samples = defaultdict(lambda: defaultdict(list))
+    for run in results['runs']:
+        if 'skipped' in run:
+            continue
+        stages = samples[(run['bank'], run['format'], run['rows'])]
+        for stage, seconds in run['stage_seconds'].items():
+            stages[stage].append(seconds)
+        stages['total'].append(run['total_seconds'])
+    return {case: {stage: sum(values) / len(values) for stage, values in stages.items()}
+            for case, stages in samples.items()}
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Compare two benchmark result files')
+    parser.add_argument('before')
+    parser.add_argument('after')
+    args = parser.parse_args()
+
+    before, after = load_runs(args.before), load_runs(args.after)
+    print(f"{'case':<24} {'stage':<18} {'before':>10} {'after':>10} {'ratio':>7}")
+    for case in sorted(before.keys() & after.keys()):
+        label = '{} {} {}'.format(*case)
+        for stage in [*sorted(before[case].keys() & after[case].keys() - {'total'}), 'total']:
+            old, new = before[case][stage], after[case][stage]
+            ratio = f'{new / old:.2f}' if old else '-'
+            print(f'{label:<24} {stage:<18} {old:>10.4f} {new:>10.4f} {ratio:>7}')
+    for case in sorted(before.keys() ^ after.keys()):
+        print('{} {} {}: only in one of the files'.format(*case))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,360 @@
+"""
+End-to-end load test of the upload routes: starts a stub of the user service token check and the
+app under gunicorn, drives concurrent uploads of generated statements to /statement/hdfc, /icici
+and /sbi, and reports throughput, latency percentiles, error rates and the peak RSS of every
+gunicorn worker.
+
+    python -m benchmarks.loadtest --database postgresql://postgres:@localhost/loadtest --workers 4 --concurrency 16
+    python -m benchmarks.loadtest --database ... --worker-class gthread --threads 4 --mix hdfc=2,icici=1,sbi=1
+    python -m benchmarks.loadtest --database sqlite:////tmp/loadtest.db --config gunicorn.conf.py
+
+gunicorn runs with the settings given on the command line and no config file, unless --config names one
+(gunicorn.conf.py for the serving profile: preload_app, max_requests, post_fork); the command line
+settings win over the file's. The settings that took effect are printed and written with the results.
+
+The statement tables, upload batches, uploaded_files, upload jobs, ingest watermarks and daily
+summary of --database are emptied first, so never point it at real data. By default all statements
+of a bank share their seed: each file repeats most rows of the others, so the row dedup path is
+contended; --distinct-rows gives every file its own rows instead. Uploads are sent with ?full=true,
+so the ingest watermark does not drop the shared rows before the dedup and a repeated file is
+parsed again rather than answered from uploaded_files.
+Uploads carry the User-id header and a 'Bearer' token, so routes behind token_required are served by
+the stub as well. RSS is read from /proc (Linux).
+"""
+import argparse
+import datetime
+import itertools
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import numpy as np
+import requests
+
+BENCHMARK_DIR = os.path.dirname(os.path.abspath(__file__))
+REPOSITORY_DIR = os.path.dirname(BENCHMARK_DIR)
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description='Concurrent upload load test')
+    parser.add_argument('--database', required=True, help='SQLAlchemy URI of a throwaway PostgreSQL or SQLite database')
+    parser.add_argument('--config', default=os.devnull, help='gunicorn config file (default: none)')
+    parser.add_argument('--port', type=int, default=8011)
+    parser.add_argument('--workers', type=int, default=1, help='gunicorn workers')
+    parser.add_argument('--worker-class', default='sync', help='gunicorn worker class (sync, gthread ...)')
+    parser.add_argument('--threads', type=int, default=1, help='threads per gthread worker')
+    parser.add_argument('--timeout', type=int, default=120, help='gunicorn worker timeout')
+    parser.add_argument('--concurrency', type=int, default=8, help='uploads in flight')
+    parser.add_argument('--requests', type=int, default=100, help='uploads in total')
+    parser.add_argument('--mix', default='hdfc=1,icici=1,sbi=1', help='bank=weight share of the uploads')
+    parser.add_argument('--rows', type=int, default=1000, help='transactions per statement')
+    parser.add_argument('--format', default='xlsx', choices=['xlsx', 'xls'])
+    parser.add_argument('--files', type=int, default=20, help='different statements per bank')
+    parser.add_argument('--distinct-rows', action='store_true', help='no rows shared between statements')
+    parser.add_argument('--auth-port', type=int, default=5001, help='port of the token check stub')
+    parser.add_argument('--auth-latency', type=float, default=0.02, help='seconds the token check stub takes')
+    parser.add_argument('--files-dir', default=os.path.join(tempfile.gettempdir(), 'bank_statement_loadtest'))
+    parser.add_argument('--output', help='results file (default: benchmarks/results/loadtest-<time>.json)')
+    return parser.parse_args()
+
+
+def parse_mix(mix):
+    weights = {}
+    for part in mix.split(','):
+        bank, _, weight = part.partition('=')
+        weights[bank.strip()] = int(weight or 1)
+    return weights
+
+
+# < ------------------------------user service stub ------------------------------------------>
+
+def start_token_stub(port, latency):
+    """
+    POST /token_check answering like the user service: 200 with the user for any 'Bearer ...'
+    token, 401 otherwise. Returns the server and its list of served calls.
+    """
+    calls = []
+
+    class TokenCheckHandler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'
+
+        def do_POST(self):
+            calls.append(time.monotonic())
+            time.sleep(latency)
+            token = self.headers.get('Authorization', '')
+            if token.startswith('Bearer '):
+                status, body = 200, {'_id': token[7:], 'user_code': 'LOADTEST', 'user_name': 'Load Test'}
+            else:
+                status, body = 401, {'message': 'Token is invalid'}
+            payload = json.dumps(body).encode()
+            self.send_response(status)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(('127.0.0.1', port), TokenCheckHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, calls
+
+
+# < ------------------------------app under gunicorn ------------------------------------------>
+
+def prepare_database(database):
+    # Tables created and emptied in a child process, so this one never imports the app
+    script = (
+        'from admin.app import app\n'
+        'from admin.banks import BANK_FORMATS\n'
+        'from admin.database import (\n'
+        '    DailyAccountSummary, IngestBatch, IngestBatchDuplicate, IngestWatermark, UploadJob, UploadedFile, db,\n'
+        ')\n'
+        'with app.app_context():\n'
+        '    db.create_all()\n'
+        '    for bank_format in BANK_FORMATS.values():\n'
+        '        db.session.execute(bank_format["model"].__table__.delete())\n'
+        '    for model in (UploadedFile, IngestBatchDuplicate, IngestBatch, UploadJob, IngestWatermark, DailyAccountSummary):\n'
+        '        db.session.execute(model.__table__.delete())\n'
+        '    db.session.commit()\n'
+    )
+    subprocess.run([sys.executable, '-c', script], cwd=REPOSITORY_DIR, check=True,
+                   env={**os.environ, 'BANK_DATABASE_URI': database})
+
+
+# Settings of the gunicorn run reported with the results
+GUNICORN_SETTINGS = ['config', 'workers', 'worker_class', 'threads', 'timeout', 'graceful_timeout', 'keepalive',
+                     'preload_app', 'max_requests', 'max_requests_jitter', 'post_fork']
+
+
+def gunicorn_command(args, *options):
+    # The config file is always given, so gunicorn does not pick up ./gunicorn.conf.py on its own
+    return [sys.executable, '-m', 'gunicorn', '-c', args.config, '-b', f'127.0.0.1:{args.port}', '-w', str(args.workers),
+            '-k', args.worker_class, '--threads', str(args.threads), '--timeout', str(args.timeout), *options, 'wsgi:app']
+
+
+def app_env(args, database):
+    return {**os.environ, 'BANK_DATABASE_URI': database, 'TOKEN_CHECK_URL': f'http://127.0.0.1:{args.auth_port}/token_check'}
+
+
+def gunicorn_settings(args, database):
+    # Settings that take effect, config file and command line together (gunicorn --print-config)
+    output = subprocess.run(gunicorn_command(args, '--print-config'), cwd=REPOSITORY_DIR, env=app_env(args, database),
+                            check=True, capture_output=True, text=True).stdout
+    settings = {}
+    for line in output.splitlines():
+        name, _, value = line.partition('=')
+        if name.strip() in GUNICORN_SETTINGS:
+            settings[name.strip()] = value.strip()
+    return settings
+
+
+def start_app(args, database, log_path):
+    command = gunicorn_command(args)
+    env = app_env(args, database)
+    log_file = open(log_path, 'w')
+    process = subprocess.Popen(command, cwd=REPOSITORY_DIR, env=env, stdout=log_file, stderr=subprocess.STDOUT)
+
+    deadline = time.monotonic() + 60
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f'gunicorn exited with {process.returncode}, see {log_path}')
+        try:
+            # The master listens before the workers have imported the app
+            requests.get(f'http://127.0.0.1:{args.port}/', timeout=5)
+            return process
+        except requests.RequestException:
+            time.sleep(0.2)
+    process.terminate()
+    raise RuntimeError(f'gunicorn did not start, see {log_path}')
+
+
+def child_pids(pid):
+    children = []
+    for task in os.listdir(f'/proc/{pid}/task'):
+        try:
+            with open(f'/proc/{pid}/task/{task}/children') as children_file:
+                children += [int(child) for child in children_file.read().split()]
+        except FileNotFoundError:
+            pass
+    return children
+
+
+def rss_bytes(pid):
+    try:
+        with open(f'/proc/{pid}/status') as status_file:
+            for line in status_file:
+                if line.startswith('VmRSS:'):
+                    return int(line.split()[1]) * 1024
+    except FileNotFoundError:
+        pass
+    return 0
+
+
+class RssSampler(threading.Thread):
+    # Peak RSS of the gunicorn master and each of its workers, sampled every interval seconds
+    def __init__(self, master_pid, interval=0.2):
+        super().__init__(daemon=True)
+        self.master_pid, self.interval = master_pid, interval
+        self.peaks = {}
+        self.stopped = threading.Event()
+
+    def run(self):
+        while not self.stopped.is_set():
+            try:
+                pids = [self.master_pid, *child_pids(self.master_pid)]
+            except FileNotFoundError:
+                return
+            for pid in pids:
+                self.peaks[pid] = max(self.peaks.get(pid, 0), rss_bytes(pid))
+            self.stopped.wait(self.interval)
+
+    def stop(self):
+        self.stopped.set()
+        self.join()
+
+
+# < ------------------------------upload load ------------------------------------------>
+
+def statement_files(args, banks):
+    # bank -> generated statements of the run; same seed and growing sizes unless --distinct-rows
+    from benchmarks.statements import generate_statement
+
+    os.makedirs(args.files_dir, exist_ok=True)
+    files = {}
+    for bank in banks:
+        files[bank] = []
+        for index in range(args.files):
+            seed, rows = (index, args.rows) if args.distinct_rows else (0, args.rows + index)
+            path = os.path.join(args.files_dir, f'{bank}_{rows}_{seed}.{args.format}')
+            if not os.path.exists(path):
+                generate_statement(bank, rows, path, seed)
+            with open(path, 'rb') as statement:
+                files[bank].append((os.path.basename(path), statement.read(), rows))
+    return files
+
+
+def upload(session, url, bank, file_name, content, user_id):
+    start = time.perf_counter()
+    try:
+        response = session.post(f'{url}/statement/{bank}', params={'full': 'true'}, files={'file': (file_name, content)},
+                                headers={'User-id': user_id, 'Authorization': f'Bearer {user_id}'}, timeout=600)
+        status = response.status_code
+    except requests.RequestException as e:
+        status = type(e).__name__
+    return {'bank': bank, 'status': status, 'seconds': time.perf_counter() - start}
+
+
+def latency_summary(seconds):
+    if not seconds:
+        return {}
+    p50, p95, p99 = np.percentile(seconds, [50, 95, 99])
+    return {'p50': round(p50, 4), 'p95': round(p95, 4), 'p99': round(p99, 4), 'max': round(max(seconds), 4)}
+
+
+def run_load(args, files, weights):
+    url = f'http://127.0.0.1:{args.port}'
+    schedule = list(itertools.islice(itertools.cycle([bank for bank, weight in weights.items() for _ in range(weight)]),
+                                     args.requests))
+    counters = {bank: itertools.count() for bank in weights}
+    local = threading.local()
+
+    def task(number, bank):
+        if not hasattr(local, 'session'):
+            local.session = requests.Session()
+        file_name, content, rows = files[bank][next(counters[bank]) % len(files[bank])]
+        return {**upload(local.session, url, bank, file_name, content, f'loadtest-{number % 50}'), 'rows': rows}
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.concurrency) as executor:
+        results = list(executor.map(task, range(len(schedule)), schedule))
+    return results, time.perf_counter() - start
+
+
+def report(results, elapsed):
+    ok = [result for result in results if isinstance(result['status'], int) and result['status'] < 400]
+    statuses = {}
+    for result in results:
+        statuses[str(result['status'])] = statuses.get(str(result['status']), 0) + 1
+    by_bank = {}
+    for bank in sorted({result['bank'] for result in results}):
+        bank_results = [result for result in results if result['bank'] == bank]
+        by_bank[bank] = {
+            'requests': len(bank_results),
+            'error_rate': round(1 - sum(result in ok for result in bank_results) / len(bank_results), 4),
+            'latency_seconds': latency_summary([result['seconds'] for result in bank_results]),
+        }
+    return {
+        'requests': len(results),
+        'seconds': round(elapsed, 3),
+        'requests_per_second': round(len(results) / elapsed, 2),
+        'rows_per_second': round(sum(result['rows'] for result in ok) / elapsed),
+        'error_rate': round(1 - len(ok) / len(results), 4) if results else 0,
+        'statuses': statuses,
+        'latency_seconds': latency_summary([result['seconds'] for result in results]),
+        'banks': by_bank,
+    }
+
+
+def main():
+    args = parse_args()
+    weights = parse_mix(args.mix)
+    os.makedirs(args.files_dir, exist_ok=True)
+    database = args.database
+
+    files = statement_files(args, weights)
+    prepare_database(database)
+    settings = gunicorn_settings(args, database)
+    print('gunicorn: ' + ', '.join(f'{name} {value}' for name, value in settings.items()))
+    stub, token_calls = start_token_stub(args.auth_port, args.auth_latency)
+    log_path = os.path.join(args.files_dir, 'gunicorn.log')
+    app_process = start_app(args, database, log_path)
+    sampler = RssSampler(app_process.pid)
+    sampler.start()
+    try:
+        results, elapsed = run_load(args, files, weights)
+    finally:
+        sampler.stop()
+        app_process.terminate()
+        app_process.wait(timeout=30)
+        stub.shutdown()
+
+    summary = report(results, elapsed)
+    summary['token_checks'] = len(token_calls)
+    summary['peak_rss_mb'] = {('master' if pid == app_process.pid else f'worker {pid}'): round(peak / 1024 ** 2, 1)
+                              for pid, peak in sampler.peaks.items()}
+    results_file_data = {
+        'started': datetime.datetime.now(datetime.timezone.utc).isoformat(timespec='seconds'),
+        'settings': {key: value for key, value in vars(args).items() if key not in ('files_dir', 'output')},
+        'gunicorn': settings,
+        'summary': summary,
+    }
+    results_file_data['settings']['database'] = database.split(':', 1)[0]
+
+    latency = summary['latency_seconds']
+    print(f"{summary['requests']} uploads in {summary['seconds']}s: {summary['requests_per_second']} req/s, "
+          f"{summary['rows_per_second']} rows/s, error rate {summary['error_rate']:.2%} {summary['statuses']}")
+    print(f"latency p50 {latency.get('p50')}s p95 {latency.get('p95')}s p99 {latency.get('p99')}s max {latency.get('max')}s")
+    for bank, bank_summary in summary['banks'].items():
+        print(f"  {bank}: {bank_summary['requests']} uploads, error rate {bank_summary['error_rate']:.2%}, "
+              f"p95 {bank_summary['latency_seconds']['p95']}s")
+    print('peak RSS (MB): ' + ', '.join(f'{name} {mb}' for name, mb in summary['peak_rss_mb'].items()))
+    print(f"token checks served by the stub: {summary['token_checks']}; gunicorn log: {log_path}")
+
+    output = args.output or os.path.join(BENCHMARK_DIR, 'results',
+                                         'loadtest-' + datetime.datetime.now().strftime('%Y%m%d-%H%M%S') + '.json')
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, 'w') as output_file:
+        json.dump(results_file_data, output_file, indent=2)
+    print(f'results written to {output}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,141 @@
+"""
+Spreadsheet reader backends (admin/readers.py) side by side on synthetic statements (benchmarks/statements.py).
+
+For every bank / format / size and every installed backend that reads the format it times:
+    grid    whole first sheet as one DataFrame, what uploads under STREAM_UPLOAD_BYTES are sliced from
+    rows    the first sheet row by row, what bigger uploads are streamed from
+    parse   open_validated_statement + parsed_chunks, the upload path up to the insert
+and checks that every backend yields the same row fingerprints. Results go to a JSON file.
+
+    python -m benchmarks.readers --rows 1000 100000 --formats xlsx xls
+    pip install python-calamine   # adds the calamine backend
+"""
+import argparse
+import datetime
+import hashlib
+import json
+import os
+import platform
+import tempfile
+import time
+
+from benchmarks.run import BENCHMARK_DIR, git_commit, statement_file
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description='Compare the spreadsheet reader backends')
+    parser.add_argument('--banks', nargs='+', default=['hdfc', 'icici', 'sbi'], choices=['hdfc', 'icici', 'sbi'])
+    parser.add_argument('--rows', nargs='+', type=int, default=[1000, 10000])
+    parser.add_argument('--formats', nargs='+', default=['xlsx', 'xls'], choices=['xlsx', 'xls'])
+    parser.add_argument('--repeat', type=int, default=1)
+    parser.add_argument('--files-dir', default=os.path.join(tempfile.gettempdir(), 'bank_statement_benchmarks'),
+                        help='generated statements are kept here and reused')
+    parser.add_argument('--output', help='results file (default: benchmarks/results/readers-<time>.json)')
+    return parser.parse_args()
+
+
+def run_case(bank, path, reader):
+    from werkzeug.datastructures import FileStorage
+
+    from admin.ingest import open_validated_statement, parsed_chunks
+    from admin.readers import iter_sheet_rows, read_statement
+
+    timings, fingerprints = {}, hashlib.md5()
+    with open(path, 'rb') as stream:
+        file = FileStorage(stream=stream, filename=os.path.basename(path))
+
+        start = time.perf_counter()
+        read_statement(file, reader)
+        timings['grid'] = time.perf_counter() - start
+        stream.seek(0)
+
+        start = time.perf_counter()
+        sheet_rows = sum(1 for _ in iter_sheet_rows(file, reader))
+        timings['rows'] = time.perf_counter() - start
+        stream.seek(0)
+
+        start = time.perf_counter()
+        message, chunks = open_validated_statement(bank, file, reader, {})
+        if message:
+            raise RuntimeError(f'{path}: {message}')
+        rows_parsed = 0
+        for df in parsed_chunks(bank, chunks, {}, {}, []):
+            rows_parsed += len(df)
+            fingerprints.update(''.join(df['fingerprint']).encode())
+        timings['parse'] = time.perf_counter() - start
+
+    return {
+        'sheet_rows': sheet_rows,
+        'rows_parsed': rows_parsed,
+        'fingerprint_digest': fingerprints.hexdigest(),
+        'stage_seconds': {stage: round(seconds, 6) for stage, seconds in timings.items()},
+    }
+
+
+def main():
+    args = parse_args()
+    os.makedirs(args.files_dir, exist_ok=True)
+
+    import pandas as pd
+
+    import config
+    from admin.readers import READER_BACKENDS, reader_installed
+
+    readers = [reader for reader in READER_BACKENDS if reader_installed(reader)]
+    results = {
+        'started': datetime.datetime.now(datetime.timezone.utc).isoformat(timespec='seconds'),
+        'commit': git_commit(),
+        'environment': {
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'pandas': pd.__version__,
+            'readers': readers,
+        },
+        'settings': {
+            'STREAM_UPLOAD_BYTES': config.STREAM_UPLOAD_BYTES,
+            'STREAM_CHUNK_ROWS': config.STREAM_CHUNK_ROWS,
+        },
+        'runs': [],
+    }
+
+    for bank in args.banks:
+        for file_format in args.formats:
+            for rows in args.rows:
+                case = {'bank': bank, 'format': file_format, 'rows': rows}
+                try:
+                    path = statement_file(args.files_dir, bank, rows, file_format)
+                except (RuntimeError, ValueError) as e:
+                    # .xls past 65536 rows, or no xlwt to write it
+                    results['runs'].append({**case, 'skipped': str(e)})
+                    print(f'{bank} {rows} {file_format}: skipped, {e}')
+                    continue
+
+                # The first backend of the format (openpyxl / xlrd) is the baseline the others are compared with
+                baseline = None
+                for reader in readers:
+                    if file_format not in READER_BACKENDS[reader]['formats']:
+                        continue
+                    for repeat in range(args.repeat):
+                        result = run_case(bank, path, reader)
+                        if baseline is None:
+                            baseline = result
+                        result['same_rows'] = result['fingerprint_digest'] == baseline['fingerprint_digest']
+                        result['speedup'] = {stage: round(baseline['stage_seconds'][stage] / seconds, 2) if seconds else None
+                                             for stage, seconds in result['stage_seconds'].items()}
+                        results['runs'].append({**case, 'reader': reader, 'repeat': repeat,
+                                                'file_bytes': os.path.getsize(path), **result})
+                        stages = ', '.join(f'{stage} {seconds:.3f}s (x{result["speedup"][stage]})'
+                                           for stage, seconds in result['stage_seconds'].items())
+                        same = '' if result['same_rows'] else ', ROWS DIFFER'
+                        print(f'{bank} {rows} {file_format} {reader}: {stages}{same}')
+
+    output = args.output or os.path.join(BENCHMARK_DIR, 'results',
+                                         'readers-' + datetime.datetime.now().strftime('%Y%m%d-%H%M%S') + '.json')
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, 'w') as results_file:
+        json.dump(results, results_file, indent=2)
+    print(f'results written to {output}')
+
+
+if __name__ == '__main__':
+    main()
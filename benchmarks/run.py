@@ -0,0 +1,187 @@
+"""
+Offline benchmark of the statement upload stages on synthetic statements (benchmarks/statements.py).
+
+For every bank / format / size it times, with the stage names of /metrics:
+    read, validate_account, validate_columns   opening the workbook and checking the header block
+    read, normalize, fingerprint               transaction rows -> rows ready to store
+    insert                                     bulk_insert into an empty table
+    dedup_insert                               bulk_insert into a table already holding --overlap of the rows
+and writes the results, with the settings they ran under, to a JSON file that compare.py diffs.
+
+    python -m benchmarks.run --rows 1000 100000 --formats xlsx xls
+    python -m benchmarks.run --database postgresql://postgres:@localhost/bench --rows 1000000 --banks hdfc
+    python -m benchmarks.compare benchmarks/results/old.json benchmarks/results/new.json
+
+The database (SQLite file by default) is created with db.create_all() and its statement tables are
+emptied before every run, so never point it at real data.
+"""
+import argparse
+import datetime
+import json
+import os
+import platform
+import subprocess
+import tempfile
+import time
+
+BENCHMARK_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description='Benchmark the statement upload stages')
+    parser.add_argument('--banks', nargs='+', default=['hdfc', 'icici', 'sbi'], choices=['hdfc', 'icici', 'sbi'])
+    parser.add_argument('--rows', nargs='+', type=int, default=[1000, 10000])
+    parser.add_argument('--formats', nargs='+', default=['xlsx'], choices=['xlsx', 'xls'])
+    parser.add_argument('--database', help='SQLAlchemy URI (default: a SQLite file in the files directory)')
+    parser.add_argument('--overlap', type=float, default=0.5,
+                        help='share of the rows already stored before the dedup_insert stage')
+    parser.add_argument('--repeat', type=int, default=1)
+    parser.add_argument('--files-dir', default=os.path.join(tempfile.gettempdir(), 'bank_statement_benchmarks'),
+                        help='generated statements are kept here and reused')
+    parser.add_argument('--output', help='results file (default: benchmarks/results/<time>.json)')
+    return parser.parse_args()
+
+
+def git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=BENCHMARK_DIR, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def statement_file(files_dir, bank, rows, file_format):
+    from benchmarks.statements import generate_statement
+
+    path = os.path.join(files_dir, f'{bank}_{rows}.{file_format}')
+    if not os.path.exists(path):
+        start = time.perf_counter()
+        partial = os.path.join(files_dir, f'partial_{bank}_{rows}.{file_format}')
+        try:
+            generate_statement(bank, rows, partial)
+        except Exception:
+            if os.path.exists(partial):
+                os.remove(partial)
+            raise
+        os.replace(partial, path)
+        print(f'generated {path} in {time.perf_counter() - start:.1f}s')
+    return path
+
+
+def run_case(bank, path, overlap):
+    import pandas as pd
+    from werkzeug.datastructures import FileStorage
+
+    from admin.banks import BANK_FORMATS
+    from admin.database import bulk_insert, db
+    from admin.ingest import open_validated_statement, parsed_chunks
+    from admin.metrics import timed
+    from admin.readers import statement_reader
+    from admin.utils import current_datetime
+
+    model = BANK_FORMATS[bank]['model']
+
+    def empty_table():
+        db.session.execute(model.__table__.delete())
+        db.session.commit()
+
+    timings, date_formats, invalid_dates = {}, {}, []
+    with open(path, 'rb') as stream:
+        file = FileStorage(stream=stream, filename=os.path.basename(path))
+        message, chunks = open_validated_statement(bank, file, statement_reader(file), timings)
+        if message:
+            raise RuntimeError(f'{path}: {message}')
+        df = pd.concat(list(parsed_chunks(bank, chunks, timings, date_formats, invalid_dates)))
+    df = df.assign(upload_admin_id='benchmark', upload_time=current_datetime())
+
+    empty_table()
+    with timed(timings, 'insert'):
+        inserted = bulk_insert(model, df)
+        db.session.commit()
+
+    empty_table()
+    stored = int(len(df) * overlap)
+    bulk_insert(model, df.iloc[:stored])
+    db.session.commit()
+    with timed(timings, 'dedup_insert'):
+        dedup_inserted = bulk_insert(model, df)
+        db.session.commit()
+    empty_table()
+
+    total = sum(seconds for stage, seconds in timings.items() if stage != 'dedup_insert')
+    return {
+        'rows_parsed': len(df),
+        'rows_inserted': inserted,
+        'invalid_dates': len(invalid_dates),
+        'dedup_rows_stored': stored,
+        'dedup_rows_inserted': dedup_inserted,
+        'stage_seconds': {stage: round(seconds, 6) for stage, seconds in timings.items()},
+        'total_seconds': round(total, 6),
+        'rows_per_second': round(len(df) / total) if total else None,
+    }
+
+
+def main():
+    args = parse_args()
+    os.makedirs(args.files_dir, exist_ok=True)
+    database = args.database or 'sqlite:///' + os.path.join(args.files_dir, 'benchmark.db')
+    # Set before anything imports config: the app reads BANK_DATABASE_URI when it is imported
+    os.environ['BANK_DATABASE_URI'] = database
+
+    import pandas as pd
+    import sqlalchemy
+
+    import config
+    from admin.app import app
+    from admin.database import db
+
+    results = {
+        'started': datetime.datetime.now(datetime.timezone.utc).isoformat(timespec='seconds'),
+        'commit': git_commit(),
+        'environment': {
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'pandas': pd.__version__,
+            'sqlalchemy': sqlalchemy.__version__,
+        },
+        'settings': {
+            'database': sqlalchemy.engine.make_url(database).get_backend_name(),
+            'overlap': args.overlap,
+            'BULK_INSERT_METHOD': config.BULK_INSERT_METHOD,
+            'BULK_INSERT_BATCH_SIZE': config.BULK_INSERT_BATCH_SIZE,
+            'STREAM_UPLOAD_BYTES': config.STREAM_UPLOAD_BYTES,
+            'STREAM_CHUNK_ROWS': config.STREAM_CHUNK_ROWS,
+            'XLSX_READER': config.XLSX_READER,
+            'XLS_READER': config.XLS_READER,
+        },
+        'runs': [],
+    }
+
+    with app.app_context():
+        db.create_all()
+        for bank in args.banks:
+            for file_format in args.formats:
+                for rows in args.rows:
+                    case = {'bank': bank, 'format': file_format, 'rows': rows}
+                    try:
+                        path = statement_file(args.files_dir, bank, rows, file_format)
+                    except (RuntimeError, ValueError) as e:
+                        # .xls past 65536 rows, or no xlwt to write it
+                        results['runs'].append({**case, 'skipped': str(e)})
+                        print(f'{bank} {rows} {file_format}: skipped, {e}')
+                        continue
+                    for repeat in range(args.repeat):
+                        result = run_case(bank, path, args.overlap)
+                        results['runs'].append({**case, 'repeat': repeat, 'file_bytes': os.path.getsize(path), **result})
+                        stages = ', '.join(f'{stage} {seconds:.3f}s' for stage, seconds in result['stage_seconds'].items())
+                        print(f"{bank} {rows} {file_format}: {result['rows_per_second']} rows/s ({stages})")
+
+    output = args.output or os.path.join(BENCHMARK_DIR, 'results', datetime.datetime.now().strftime('%Y%m%d-%H%M%S') + '.json')
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, 'w') as results_file:
+        json.dump(results, results_file, indent=2)
+    print(f'results written to {output}')
+
+
+if __name__ == '__main__':
+    main()
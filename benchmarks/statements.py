@@ -0,0 +1,140 @@
+"""
+Synthetic HDFC / ICICI / SBI statements for the benchmarks: the account details block of config.py,
+the column header at HDFC_ROW / ICICI_ROW / SBI_ROW and each bank's layout around the transactions
+(HDFC '*****' boundary rows, SBI footer after an empty row). Rows are a function of (seed, row
+number), so a smaller statement is a prefix of a bigger one with the same seed.
+
+    python -m benchmarks.statements hdfc 100000 /tmp/hdfc_100k.xlsx
+"""
+import argparse
+import datetime
+import random
+
+import openpyxl
+
+from config import (
+    HDFC_ROW, ICICI_ROW, REQUIRED_BANK_DATA_HDFC, REQUIRED_BANK_DATA_ICICI, REQUIRED_BANK_DATA_SBI, SBI_ROW,
+)
+
+# .xls sheets end at row 65536
+XLS_MAX_ROWS = 65536
+
+START_DATE = datetime.datetime(2023, 4, 1, 9, 0)
+TRANSACTIONS_PER_DAY = 40
+
+HEADERS = {
+    'hdfc': ['Date', 'Narration', 'Chq./Ref.No.', 'Value Dt', 'Withdrawal Amt.', 'Deposit Amt.', 'Closing Balance'],
+    'icici': ['No.', 'Transaction ID', 'Value Date', 'Txn Posted Date', 'ChequeNo.', 'Description', 'Cr/Dr',
+              'Transaction Amount(INR)', 'Available Balance(INR)'],
+    'sbi': ['Txn Date', 'Value Date', 'Description', 'Ref No./Cheque No.', 'Branch Code', 'Debit', 'Credit', 'Balance'],
+}
+
+
+def _transactions(rows, seed):
+    # (row number, timestamp, withdrawal, deposit, balance, narration, reference) of every transaction
+    rng = random.Random(seed)
+    balance = 1_000_000.0
+    for number in range(rows):
+        when = START_DATE + datetime.timedelta(minutes=number * 24 * 60 // TRANSACTIONS_PER_DAY)
+        amount = round(rng.lognormvariate(7, 1.5), 2)
+        credit = rng.random() < 0.45
+        serial = seed * 10 ** 9 + number
+        kind = number % 3
+        if kind == 0:
+            narration = f"NEFT CR-ACME0000{number % 1000:03d}-CUSTOMER {number % 997} LTD-ACME{serial % 10 ** 12:012d}"
+        elif kind == 1:
+            narration = f"UPI/{serial % 10 ** 12:012d}/PAYMENT FROM {number % 541}/OKAXIS"
+        else:
+            narration = f"CHQ PAID-MICR CTS-GURGAON-{number % 313}"
+        balance = round(balance + (amount if credit else -amount), 2)
+        yield number, when, None if credit else amount, amount if credit else None, balance, narration, f"{serial:016d}"
+
+
+def hdfc_rows(rows, seed=0):
+    yield from ([line] for line in sorted(REQUIRED_BANK_DATA_HDFC))
+    for _ in range(HDFC_ROW - len(REQUIRED_BANK_DATA_HDFC)):
+        yield []
+    yield HEADERS['hdfc']
+    yield ['*' * 10] * len(HEADERS['hdfc'])
+    for _, when, withdrawal, deposit, balance, narration, reference in _transactions(rows, seed):
+        day = when.strftime('%d/%m/%y')
+        yield [day, narration, reference, day, withdrawal, deposit, balance]
+    yield ['*' * 10] * len(HEADERS['hdfc'])
+    yield ['STATEMENT SUMMARY :-']
+    yield ['Opening Balance', 'Dr Count', 'Cr Count', 'Debits', 'Credits', 'Closing Bal']
+
+
+def icici_rows(rows, seed=0):
+    yield from ([line] for line in sorted(REQUIRED_BANK_DATA_ICICI))
+    for _ in range(ICICI_ROW - len(REQUIRED_BANK_DATA_ICICI)):
+        yield []
+    yield HEADERS['icici']
+    for number, when, withdrawal, deposit, balance, narration, reference in _transactions(rows, seed):
+        yield [number + 1, f"S{seed * 10 ** 9 + number:010d}", when.strftime('%d/%m/%Y'),
+               when.strftime('%d/%m/%Y %I:%M:%S %p'), '-', narration, 'CR' if deposit else 'DR',
+               deposit or withdrawal, balance]
+
+
+def sbi_rows(rows, seed=0):
+    yield from ([line] for line in sorted(REQUIRED_BANK_DATA_SBI))
+    for _ in range(SBI_ROW - len(REQUIRED_BANK_DATA_SBI)):
+        yield []
+    yield HEADERS['sbi']
+    for _, when, withdrawal, deposit, balance, narration, reference in _transactions(rows, seed):
+        day = when.strftime('%d %b %Y')
+        yield [day, day, f"BY TRANSFER-{narration}", f"TRANSFER FROM {reference}", '2300',
+               withdrawal or ' ', deposit or ' ', balance]
+    yield []
+    yield ['**This is a computer generated statement and does not require a signature']
+
+
+STATEMENT_ROWS = {'hdfc': hdfc_rows, 'icici': icici_rows, 'sbi': sbi_rows}
+
+
+def _write_xlsx(sheet_rows, path):
+    book = openpyxl.Workbook(write_only=True)
+    sheet = book.create_sheet()
+    for row in sheet_rows:
+        sheet.append(row)
+    book.save(path)
+
+
+def _write_xls(sheet_rows, path):
+    try:
+        import xlwt
+    except ImportError:
+        raise RuntimeError("Writing .xls statements needs xlwt (pip install xlwt)")
+
+    book = xlwt.Workbook()
+    sheet = book.add_sheet('Sheet1')
+    for index, row in enumerate(sheet_rows):
+        if index >= XLS_MAX_ROWS:
+            raise ValueError(f".xls statements hold at most {XLS_MAX_ROWS} rows")
+        for column, value in enumerate(row):
+            if value is not None:
+                sheet.write(index, column, value)
+    book.save(path)
+
+
+def generate_statement(bank, rows, path, seed=0):
+    # Writes a statement of `rows` transactions; .xls or .xlsx by the extension of path
+    sheet_rows = STATEMENT_ROWS[bank](rows, seed)
+    if path.lower().endswith('.xls'):
+        _write_xls(sheet_rows, path)
+    else:
+        _write_xlsx(sheet_rows, path)
+    return path
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Write a synthetic bank statement')
+    parser.add_argument('bank', choices=sorted(STATEMENT_ROWS))
+    parser.add_argument('rows', type=int)
+    parser.add_argument('path', help='.xlsx or .xls output file')
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+    generate_statement(args.bank, args.rows, args.path, args.seed)
+
+
+if __name__ == '__main__':
+    main()
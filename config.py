@@ -1,4 +1,5 @@
 import os
+import tempfile
 from dotenv import load_dotenv
 
 load_dotenv()
@@ -6,6 +7,87 @@ load_dotenv()
 # DataBase URL
 BANK_DATABASE_URI = os.getenv('BANK_DATABASE_URI')
 
+# Log file shared by all workers; JSON lines, rotated daily
+LOG_FILE = os.getenv('LOG_FILE', 'logs/admin.logs')
+
+# Bulk insert of statement rows: 'values' (multi-row INSERT), 'executemany' (insertmanyvalues) or 'copy' (PostgreSQL COPY)
+BULK_INSERT_METHOD = os.getenv('BULK_INSERT_METHOD', 'executemany')
+BULK_INSERT_BATCH_SIZE = int(os.getenv('BULK_INSERT_BATCH_SIZE', 1000))
+
+# Background upload jobs: '?async=true' on an upload route (or ASYNC_UPLOADS=true for all uploads)
+ASYNC_UPLOADS = os.getenv('ASYNC_UPLOADS', 'false').lower() == 'true'
+UPLOAD_WORKERS = int(os.getenv('UPLOAD_WORKERS', 2))
+UPLOAD_JOB_DIR = os.getenv('UPLOAD_JOB_DIR', os.path.join(tempfile.gettempdir(), 'bank_statement_jobs'))
+
+# Serving profile of gunicorn.conf.py: GUNICORN_WORKERS processes (gthread) of GUNICORN_THREADS request threads
+GUNICORN_BIND = os.getenv('GUNICORN_BIND', '0.0.0.0:8011')
+GUNICORN_WORKERS = int(os.getenv('GUNICORN_WORKERS', (os.cpu_count() or 1) + 1))
+GUNICORN_THREADS = int(os.getenv('GUNICORN_THREADS', 4))
+GUNICORN_TIMEOUT = int(os.getenv('GUNICORN_TIMEOUT', 300))
+
+# Connection pool of each worker process: a connection per request thread and upload job thread, plus
+# DB_MAX_OVERFLOW. The database sees up to GUNICORN_WORKERS x (DB_POOL_SIZE + DB_MAX_OVERFLOW) connections.
+SQLALCHEMY_ENGINE_OPTIONS = {
+    'pool_size': int(os.getenv('DB_POOL_SIZE', GUNICORN_THREADS + UPLOAD_WORKERS)),
+    'max_overflow': int(os.getenv('DB_MAX_OVERFLOW', 2)),
+    'pool_timeout': int(os.getenv('DB_POOL_TIMEOUT', 30)),
+    'pool_recycle': int(os.getenv('DB_POOL_RECYCLE', 1800)),
+    'pool_pre_ping': True,
+}
+
+# Statements of STREAM_UPLOAD_BYTES or more are read row by row and stored STREAM_CHUNK_ROWS rows at a time
+STREAM_UPLOAD_BYTES = int(os.getenv('STREAM_UPLOAD_BYTES', 10 * 1024 * 1024))
+STREAM_CHUNK_ROWS = int(os.getenv('STREAM_CHUNK_ROWS', 5000))
+
+# Spreadsheet reader of .xlsx and .xls statements (told apart by their first bytes): openpyxl, xlrd or calamine.
+# 'auto' takes calamine (pip install python-calamine) when it is installed, else openpyxl for .xlsx and xlrd for .xls
+XLSX_READER = os.getenv('XLSX_READER', 'auto')
+XLS_READER = os.getenv('XLS_READER', 'auto')
+
+# Uploaded files of UPLOAD_SPOOL_BYTES or more are written to a named temp file in UPLOAD_SPOOL_DIR while the
+# request is parsed; the Excel readers then open it by path (xlrd memory-maps it) instead of copying the stream
+UPLOAD_SPOOL_BYTES = int(os.getenv('UPLOAD_SPOOL_BYTES', 512 * 1024))
+UPLOAD_SPOOL_DIR = os.getenv('UPLOAD_SPOOL_DIR') or None
+
+# Admission control of statement uploads, per worker process: at most UPLOAD_MAX_PARSES files parsed at once
+# and UPLOAD_MAX_INFLIGHT_BYTES of them in flight. An upload waits up to UPLOAD_ADMISSION_WAIT seconds
+# for room, then gets a 503 with Retry-After: UPLOAD_RETRY_AFTER. Bigger requests than MAX_CONTENT_LENGTH get a 413.
+UPLOAD_MAX_PARSES = int(os.getenv('UPLOAD_MAX_PARSES', 2))
+UPLOAD_MAX_INFLIGHT_BYTES = int(os.getenv('UPLOAD_MAX_INFLIGHT_BYTES', 100 * 1024 * 1024))
+UPLOAD_ADMISSION_WAIT = float(os.getenv('UPLOAD_ADMISSION_WAIT', 10))
+UPLOAD_RETRY_AFTER = int(os.getenv('UPLOAD_RETRY_AFTER', 30))
+MAX_CONTENT_LENGTH = int(os.getenv('MAX_CONTENT_LENGTH', 50 * 1024 * 1024))
+
+# 'flask backfill-statements': processes parsing historical statements (0 = one per CPU), recorded as BACKFILL_ADMIN_ID
+BACKFILL_WORKERS = int(os.getenv('BACKFILL_WORKERS', 0))
+BACKFILL_ADMIN_ID = os.getenv('BACKFILL_ADMIN_ID', 'backfill')
+
+# Token verification with the user micro service; verified tokens are cached for TOKEN_CACHE_TTL seconds,
+# rejected ones for TOKEN_CACHE_NEGATIVE_TTL seconds
+TOKEN_CHECK_URL = os.getenv('TOKEN_CHECK_URL', 'http://127.0.0.1:5001/token_check')
+TOKEN_CHECK_CONNECT_TIMEOUT = float(os.getenv('TOKEN_CHECK_CONNECT_TIMEOUT', 2))
+TOKEN_CHECK_READ_TIMEOUT = float(os.getenv('TOKEN_CHECK_READ_TIMEOUT', 5))
+TOKEN_CHECK_POOL_SIZE = int(os.getenv('TOKEN_CHECK_POOL_SIZE', 10))
+TOKEN_CACHE_TTL = float(os.getenv('TOKEN_CACHE_TTL', 300))
+TOKEN_CACHE_NEGATIVE_TTL = float(os.getenv('TOKEN_CACHE_NEGATIVE_TTL', 30))
+TOKEN_CACHE_SIZE = int(os.getenv('TOKEN_CACHE_SIZE', 10000))
+
+# Page size of GET /statement/<bank> (?limit=), capped at STATEMENT_MAX_PAGE_SIZE
+STATEMENT_PAGE_SIZE = int(os.getenv('STATEMENT_PAGE_SIZE', 100))
+STATEMENT_MAX_PAGE_SIZE = int(os.getenv('STATEMENT_MAX_PAGE_SIZE', 1000))
+
+# GET /statement/<bank>/export reads EXPORT_FETCH_ROWS rows per server-side cursor fetch and writes
+# Parquet row groups of EXPORT_ROW_GROUP_ROWS rows
+EXPORT_FETCH_ROWS = int(os.getenv('EXPORT_FETCH_ROWS', 10000))
+EXPORT_ROW_GROUP_ROWS = int(os.getenv('EXPORT_ROW_GROUP_ROWS', 100000))
+
+# Most results of GET /statement/search
+SEARCH_RESULT_LIMIT = int(os.getenv('SEARCH_RESULT_LIMIT', 50))
+
+# Reconciliation: a payment matches a credit of the same amount within RECONCILE_WINDOW_DAYS of its date
+RECONCILE_WINDOW_DAYS = int(os.getenv('RECONCILE_WINDOW_DAYS', 3))
+RECONCILE_MAX_PAYMENTS = int(os.getenv('RECONCILE_MAX_PAYMENTS', 100000))
+
 # Admin upload the bank statements start the data row 
 HDFC_ROW = 20
 ICICI_ROW = 6
@@ -0,0 +1,42 @@
+# Serving profile, settings in config.py: gunicorn -c gunicorn.conf.py wsgi:app
+import os
+
+from config import GUNICORN_BIND, GUNICORN_THREADS, GUNICORN_TIMEOUT, GUNICORN_WORKERS
+
+bind = GUNICORN_BIND
+workers = GUNICORN_WORKERS
+# Threads serve the requests waiting on the database or the user service while another one parses
+worker_class = 'gthread'
+threads = GUNICORN_THREADS
+
+# pandas, openpyxl and the app are imported once in the master and shared copy-on-write by the workers
+preload_app = True
+
+# Big statements take a while to parse and store
+timeout = GUNICORN_TIMEOUT
+graceful_timeout = 60
+keepalive = 5
+
+# Workers are replaced now and then, so memory held by the parser after big uploads is given back
+max_requests = 500
+max_requests_jitter = 50
+
+# Worker heartbeat files on tmpfs; a container's /tmp may be disk backed
+worker_tmp_dir = '/dev/shm' if os.path.isdir('/dev/shm') else None
+
+accesslog = '-'
+
+
+def post_fork(server, worker):
+    # Connections the master may have opened before the fork are not shared with the workers
+    from admin.app import app
+    from admin.database import db
+    from admin.jobs import fail_stale_jobs
+
+    with app.app_context():
+        db.engine.dispose(close=False)
+        # Upload jobs of a worker that was replaced died with it; the worker still starts when they cannot be checked
+        try:
+            fail_stale_jobs()
+        except Exception as e:
+            app.logger.warning(f"Upload jobs of stopped workers not checked: {e}")
@@ -1,28 +1,127 @@
+import atexit
+import json
 import logging
+import os
+import queue
+import threading
+import time
 
-from logging.handlers import TimedRotatingFileHandler
-from flask import Flask, request
+from logging.handlers import QueueHandler, QueueListener, TimedRotatingFileHandler
+from flask import has_request_context, request
 
+from config import LOG_FILE
+
+try:
+    import fcntl
+except ImportError:  # no cross-process locking on Windows
+    fcntl = None
 
-app = Flask(__name__)
 
-# Set up logging
 logging.basicConfig(level=logging.INFO)
-formatter = logging.Formatter('%(asctime)s --- %(levelname)s --- %(message)s')
-log_file = "logs/admin.logs"
-file_handler = TimedRotatingFileHandler(log_file, when="D", interval=1, backupCount=5)
-file_handler.setFormatter(formatter)
-app.logger.addHandler(file_handler)
-logging.shutdown()
+
+
+class JsonFormatter(logging.Formatter):
+    # One JSON object per line; built on the listener thread, not on the request path
+    def format(self, record):
+        event = {
+            'time': self.formatTime(record),
+            'level': record.levelname,
+            'message': record.getMessage(),
+            **getattr(record, 'event', {}),
+        }
+        if record.exc_info:
+            event['exception'] = self.formatException(record.exc_info)
+        return json.dumps(event, default=str)
+
+
+class SharedTimedRotatingFileHandler(TimedRotatingFileHandler):
+    """
+    TimedRotatingFileHandler for a file shared by several worker processes: writes and rollovers
+    happen under an flock on '<file>.lock', and a worker whose file was already rotated by another
+    one reopens the new file instead of rotating it again.
+    """
+    def __init__(self, filename, **kwargs):
+        super().__init__(filename, **kwargs)
+        self.lock_file = open(f'{self.baseFilename}.lock', 'a') if fcntl else None
+
+    def _reopen_if_rotated(self):
+        try:
+            rotated = os.stat(self.baseFilename).st_ino != os.fstat(self.stream.fileno()).st_ino
+        except (FileNotFoundError, AttributeError, ValueError):
+            rotated = True
+        if rotated:
+            if self.stream:
+                self.stream.close()
+            self.stream = self._open()
+            self.rolloverAt = self.computeRollover(int(time.time()))
+
+    def emit(self, record):
+        if not self.lock_file:
+            return super().emit(record)
+        fcntl.flock(self.lock_file, fcntl.LOCK_EX)
+        try:
+            self._reopen_if_rotated()
+            super().emit(record)
+        finally:
+            fcntl.flock(self.lock_file, fcntl.LOCK_UN)
+
+
+class _QueueHandler(QueueHandler):
+    # Queue the record as is: message formatting is left to the listener thread
+    def prepare(self, record):
+        return record
+
+
+logger = logging.getLogger('bank_statements')
+logger.setLevel(logging.INFO)
+logger.propagate = False
+
+_queue = queue.SimpleQueue()
+logger.addHandler(_QueueHandler(_queue))
+
+_listener = None
+_listener_pid = None
+_listener_lock = threading.Lock()
+
+
+def _start_listener():
+    # Started per process on first use, so workers forked from a preloaded app get their own thread
+    global _listener, _listener_pid
+    if _listener_pid == os.getpid():
+        return
+    with _listener_lock:
+        if _listener_pid != os.getpid():
+            _listener = _new_listener()
+            _listener_pid = os.getpid()
+            atexit.register(_listener.stop)
+
+
+def _new_listener():
+    os.makedirs(os.path.dirname(LOG_FILE) or '.', exist_ok=True)
+    formatter = JsonFormatter()
+    file_handler = SharedTimedRotatingFileHandler(LOG_FILE, when="D", interval=1, backupCount=5)
+    console_handler = logging.StreamHandler()
+    for handler in (file_handler, console_handler):
+        handler.setFormatter(formatter)
+
+    listener = QueueListener(_queue, file_handler, console_handler, respect_handler_level=True)
+    listener.start()
+    return listener
 
 
 # Logger modify
 def log_data(message, event_type, log_level, additional_context=None):
+    _start_listener()
 
-    browser_info = request.headers.get('User-Agent')
-    ip_address = request.headers.get('X-Forwarded-For', request.remote_addr)
-
-    log_message = (f"message: {message}  ---- Event: {event_type} ---- browser_info: {browser_info} ---- ip_address: {ip_address} ---- "
-                   f"{additional_context}")
-    app.logger.log(log_level, log_message)
+    # Background upload jobs log outside of a request
+    browser_info, ip_address = None, None
+    if has_request_context():
+        browser_info = request.headers.get('User-Agent')
+        ip_address = request.headers.get('X-Forwarded-For', request.remote_addr)
 
+    logger.log(log_level, message, extra={'event': {
+        'event_type': event_type,
+        'browser_info': browser_info,
+        'ip_address': ip_address,
+        'context': additional_context,
+    }})
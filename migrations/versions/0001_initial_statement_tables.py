@@ -0,0 +1,68 @@
+"""Statement tables as first deployed
+
+Revision ID: 0001
+Revises:
+Create Date: 2026-10-18 09:20:00
+
+Databases created before migrations were added already have these tables: run
+`flask db stamp 0001` once there, then `flask db upgrade`.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0001'
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('icici_statements',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('transaction_id', sa.String(length=60), nullable=True),
+    sa.Column('transaction_date', sa.DateTime(), nullable=True),
+    sa.Column('Ref_or_Cheque_number', sa.String(length=255), nullable=True),
+    sa.Column('description', sa.String(length=255), nullable=True),
+    sa.Column('credit_or_debit', sa.String(length=60), nullable=True),
+    sa.Column('transaction_amount', sa.Numeric(precision=12, scale=2), nullable=True),
+    sa.Column('available_amount', sa.Numeric(precision=12, scale=2), nullable=True),
+    sa.Column('upload_admin_id', sa.String(length=50), nullable=True),
+    sa.Column('upload_time', sa.DateTime(), nullable=True),
+    sa.Column('status', sa.Boolean(), nullable=False),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_table('hdfc_statements',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('transaction_date', sa.DateTime(), nullable=True),
+    sa.Column('narration', sa.String(length=255), nullable=True),
+    sa.Column('Ref_or_Cheque_number', sa.String(length=255), nullable=True),
+    sa.Column('withdrawal_amount', sa.Numeric(precision=12, scale=2), nullable=True),
+    sa.Column('deposit_amount', sa.Numeric(precision=12, scale=2), nullable=True),
+    sa.Column('closing_amount', sa.Numeric(precision=12, scale=2), nullable=True),
+    sa.Column('upload_admin_id', sa.String(length=50), nullable=True),
+    sa.Column('upload_time', sa.DateTime(), nullable=True),
+    sa.Column('status', sa.Boolean(), nullable=False),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_table('sbi_statements',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('transaction_date', sa.DateTime(), nullable=True),
+    sa.Column('description', sa.String(length=255), nullable=True),
+    sa.Column('Ref_or_Cheque_number', sa.String(length=255), nullable=True),
+    sa.Column('branch_code', sa.String(), nullable=True),
+    sa.Column('withdrawal_amount', sa.Float(), nullable=True),
+    sa.Column('deposit_amount', sa.Float(), nullable=True),
+    sa.Column('closing_amount', sa.Float(), nullable=True),
+    sa.Column('upload_admin_id', sa.String(length=50), nullable=True),
+    sa.Column('upload_time', sa.DateTime(), nullable=True),
+    sa.Column('status', sa.Boolean(), nullable=False),
+    sa.PrimaryKeyConstraint('id')
+    )
+
+
+def downgrade():
+    op.drop_table('sbi_statements')
+    op.drop_table('hdfc_statements')
+    op.drop_table('icici_statements')
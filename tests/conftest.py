@@ -0,0 +1,24 @@
+import os
+import sys
+import tempfile
+
+import pytest
+
+# The app reads its settings at import: a throwaway SQLite database and log file for the test session
+TEST_DIR = tempfile.mkdtemp(prefix='bank_statement_tests_')
+os.environ['BANK_DATABASE_URI'] = 'sqlite:///' + os.path.join(TEST_DIR, 'bank.db')
+os.environ['LOG_FILE'] = os.path.join(TEST_DIR, 'admin.logs')
+os.environ['UPLOAD_JOB_DIR'] = os.path.join(TEST_DIR, 'jobs')
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+@pytest.fixture
+def app():
+    from admin.app import app
+    from admin.database import db
+
+    with app.app_context():
+        db.create_all()
+        yield app
+        db.session.remove()
+        db.drop_all()
@@ -0,0 +1,19 @@
+import datetime
+from decimal import Decimal
+
+from admin.database import HdfcStatement, backfill_fingerprints, db
+
+
+def test_backfill_fingerprints_pages_through_the_rows(app):
+    # 5 rows, the last one repeating the first: it keeps a NULL fingerprint
+    rows = [dict(transaction_date=datetime.datetime(2024, 1, day), narration=f'NEFT CR {day}', Ref_or_Cheque_number=str(day),
+                 deposit_amount=Decimal('100.00'), closing_amount=Decimal(100 * day)) for day in range(1, 5)]
+    db.session.add_all(HdfcStatement(**row, status=False) for row in rows + rows[:1])
+    db.session.commit()
+
+    assert backfill_fingerprints(HdfcStatement, batch_size=2) == 4
+
+    fingerprints = [row.fingerprint for row in HdfcStatement.query.order_by(HdfcStatement.id)]
+    assert all(fingerprints[:4]) and len(set(fingerprints[:4])) == 4
+    assert fingerprints[4] is None
+    assert backfill_fingerprints(HdfcStatement, batch_size=2) == 0
@@ -0,0 +1,42 @@
+import os
+
+from werkzeug.datastructures import FileStorage
+
+from admin.database import IngestBatch, UploadedFile
+from admin.ingest import process_statement_file
+from benchmarks.statements import generate_statement
+from tests.conftest import TEST_DIR
+
+
+def upload(path, use_watermark=True):
+    with open(path, 'rb') as stream:
+        return process_statement_file('hdfc', FileStorage(stream=stream, filename=os.path.basename(path)), 'admin',
+                                      use_watermark)
+
+
+def test_overlapping_upload_is_answered_from_its_digest(app):
+    # 200 then 240 rows of the same statement: the second file overlaps the watermark set by the first
+    upload(generate_statement('hdfc', 200, os.path.join(TEST_DIR, 'hdfc_200.xlsx')))
+    path = generate_statement('hdfc', 240, os.path.join(TEST_DIR, 'hdfc_240.xlsx'))
+    result, status_code = upload(path)
+    assert status_code == 201
+    assert result['rows_before_watermark'] > 0
+    assert UploadedFile.query.filter_by(batch_id=result['batch_id']).count() == 1
+
+    batches = IngestBatch.query.count()
+    again, status_code = upload(path)
+
+    assert status_code == 201
+    assert again == {'message': result['message'], 'duplicate_file': True, 'batch_id': result['batch_id']}
+    assert IngestBatch.query.count() == batches
+
+
+def test_full_read_parses_a_recorded_file_again(app):
+    path = generate_statement('hdfc', 200, os.path.join(TEST_DIR, 'hdfc_200.xlsx'))
+    upload(path)
+
+    result, status_code = upload(path, use_watermark=False)
+
+    assert status_code == 200
+    assert 'duplicate_file' not in result
+    assert result['rows_parsed'] == 200
@@ -0,0 +1,14 @@
+import datetime
+
+from admin.database import UploadJob, db
+
+
+def test_job_times_are_iso_8601(app):
+    db.session.add(UploadJob(id='job-1', bank='hdfc', state='queued', created_time=datetime.datetime(2024, 1, 2, 3, 4, 5)))
+    db.session.commit()
+
+    response = app.test_client().get('/statement/jobs/job-1')
+
+    assert response.status_code == 200
+    assert response.json['created_time'] == '2024-01-02T03:04:05'
+    assert response.json['started_time'] is None
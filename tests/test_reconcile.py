@@ -0,0 +1,75 @@
+import datetime
+from decimal import Decimal
+
+import pandas as pd
+
+from admin.reconcile import match_by_amount, parse_payments
+
+
+def add_credits(count, amount, transaction_date):
+    from admin.database import HdfcStatement, db
+
+    db.session.add_all(HdfcStatement(transaction_date=transaction_date, narration=f'NEFT CR {index}',
+                                     deposit_amount=Decimal(amount), status=False, fingerprint=f'credit-{index}')
+                       for index in range(count))
+    db.session.commit()
+
+
+def test_equal_amounts_all_match():
+    # More equal amounts than one merge_asof round pairs
+    payments = pd.DataFrame({'payment_key': range(50), 'cents': 50000, 'date': pd.Timestamp('2024-01-01')})
+    credits = pd.DataFrame({'credit_key': range(50), 'cents': 50000, 'transaction_date': pd.Timestamp('2024-01-02')})
+
+    matches = match_by_amount(payments, credits, pd.Timedelta(days=3))
+
+    assert sorted(matches['payment_key']) == list(range(50))
+    assert sorted(matches['credit_key']) == list(range(50))
+
+
+def test_equal_amounts_outside_the_window_are_left():
+    payments = pd.DataFrame({'payment_key': [0, 1], 'cents': 50000,
+                             'date': [pd.Timestamp('2024-01-01'), pd.Timestamp('2024-01-10')]})
+    credits = pd.DataFrame({'credit_key': [0, 1], 'cents': 50000,
+                            'transaction_date': [pd.Timestamp('2024-01-10'), pd.Timestamp('2024-01-20')]})
+
+    matches = match_by_amount(payments, credits, pd.Timedelta(days=3))
+
+    assert matches[['payment_key', 'credit_key']].values.tolist() == [[1, 0]]
+
+
+def test_reconcile_equal_amounts(app):
+    add_credits(50, '500.00', datetime.datetime(2024, 1, 2))
+
+    response = app.test_client().post('/statement/reconcile', headers={'User-id': 'admin'}, json={
+        'payments': [{'id': index, 'amount': 500, 'date': '2024-01-01'} for index in range(50)], 'dry_run': True})
+
+    assert response.status_code == 200
+    assert response.json['matched'] == 50
+    assert response.json['unmatched'] == []
+
+
+def test_parse_payments_converts_offsets_to_local_time():
+    payments, invalid = parse_payments([{'amount': 1, 'date': '2023-04-01T10:00:00Z'},
+                                        {'amount': 1, 'date': '2023-04-01T10:00:00+05:30'},
+                                        {'amount': 1, 'date': '2023-04-01'}])
+
+    utc = datetime.datetime(2023, 4, 1, 10, tzinfo=datetime.timezone.utc)
+    assert invalid == []
+    assert payments['date'].dt.tz is None
+    assert payments['date'].tolist() == [
+        pd.Timestamp(utc.astimezone().replace(tzinfo=None)),
+        pd.Timestamp((utc - datetime.timedelta(hours=5, minutes=30)).astimezone().replace(tzinfo=None)),
+        pd.Timestamp('2023-04-01'),
+    ]
+
+
+def test_reconcile_dates_with_offsets(app):
+    add_credits(1, '500.00', datetime.datetime(2023, 4, 1))
+
+    response = app.test_client().post('/statement/reconcile', headers={'User-id': 'admin'}, json={
+        'payments': [{'id': 'a', 'amount': 500, 'date': '2023-04-01T10:00:00Z'},
+                     {'id': 'b', 'amount': 700, 'date': '2023-04-01T10:00:00+05:30'}], 'dry_run': True})
+
+    assert response.status_code == 200
+    assert response.json['matched'] == 1
+    assert response.json['unmatched'] == ['b']
@@ -1,4 +1,11 @@
 from admin.app import app
 
 if __name__ == "__main__":
+    from admin.jobs import fail_stale_jobs
+
+    with app.app_context():
+        try:
+            fail_stale_jobs()
+        except Exception as e:
+            app.logger.warning(f"Upload jobs of stopped workers not checked: {e}")
     app.run(debug=True)